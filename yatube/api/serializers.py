@@ -0,0 +1,37 @@
+"""Компактные словари для JSON: только то, что рисует клиент."""
+
+
+def file_url(request, field):
+    return request.build_absolute_uri(field.url) if field else None
+
+
+def serialize_user(user):
+    return {
+        'username': user.username,
+        'name': user.get_full_name() or user.username,
+    }
+
+
+def serialize_post(request, post):
+    return {
+        'id': post.id,
+        'text': post.text,
+        'pub_date': post.pub_date.isoformat(),
+        'author': serialize_user(post.author),
+        'group': post.group and {
+            'slug': post.group.slug,
+            'title': post.group.title,
+        },
+        'image': file_url(request, post.image),
+        'thumbnail': file_url(request, post.thumbnail),
+        'comments_count': post.comments_count,
+    }
+
+
+def serialize_comment(comment):
+    return {
+        'id': comment.id,
+        'text': comment.text,
+        'created': comment.created.isoformat(),
+        'author': serialize_user(comment.author),
+    }
@@ -0,0 +1,100 @@
+from http import HTTPStatus
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class ApiViewsTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            username='author', first_name='Лев', last_name='Толстой')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание')
+        Post.objects.bulk_create([
+            Post(text=f'Пост {i}', author=cls.author, group=cls.group)
+            for i in range(settings.NUMBER_POST + 3)
+        ])
+        cls.post = Post.objects.first()
+        Comment.objects.create(
+            post=cls.post, author=cls.reader, text='Комментарий')
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def test_feeds(self):
+        """Ленты отдают страницу постов и ссылку на следующую."""
+        urls = (
+            reverse('api:index'),
+            reverse('api:group_posts', kwargs={'slug': self.group.slug}),
+            reverse('api:profile', kwargs={'username': 'author'}),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                data = self.guest_client.get(url).json()
+                self.assertEqual(len(data['results']), settings.NUMBER_POST)
+                self.assertEqual(data['results'][0]['author'], {
+                    'username': 'author', 'name': 'Лев Толстой'})
+                self.assertEqual(data['results'][0]['group']['slug'], 'group')
+                second = self.guest_client.get(data['next']).json()
+                self.assertEqual(len(second['results']), 3)
+                self.assertIsNone(second['next'])
+
+    def test_post_detail(self):
+        """Пост приходит вместе с первой страницей комментариев."""
+        data = self.guest_client.get(
+            reverse('api:post_detail', kwargs={'post_id': self.post.id})
+        ).json()
+        self.assertEqual(data['post']['id'], self.post.id)
+        self.assertEqual(data['post']['comments_count'], 1)
+        self.assertIsNone(data['post']['thumbnail'])
+        self.assertEqual(data['comments'][0]['text'], 'Комментарий')
+        self.assertIsNone(data['next'])
+
+    def test_not_found(self):
+        response = self.guest_client.get(
+            reverse('api:group_posts', kwargs={'slug': 'missing'}))
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+        self.assertEqual(response.json(), {'detail': 'Не найдено'})
+
+    def test_read_only(self):
+        response = self.reader_client.post(reverse('api:index'))
+        self.assertEqual(
+            response.status_code, HTTPStatus.METHOD_NOT_ALLOWED)
+
+    def test_etag(self):
+        """Неизменная лента отвечает 304 без запросов к базе."""
+        url = reverse('api:index')
+        etag = self.guest_client.get(url)['ETag']
+        with self.assertNumQueries(0):
+            response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+        Post.objects.create(text='Новый пост', author=self.author)
+        response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertEqual(response.json()['results'][0]['text'], 'Новый пост')
+
+    def test_follow(self):
+        """Лента подписок требует входа и меняет ETag при подписке."""
+        url = reverse('api:follow_index')
+        self.assertEqual(
+            self.guest_client.get(url).status_code, HTTPStatus.UNAUTHORIZED)
+        response = self.reader_client.get(url)
+        self.assertEqual(response.json()['results'], [])
+        Follow.objects.create(user=self.reader, author=self.author)
+        response = self.reader_client.get(
+            url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertEqual(
+            len(response.json()['results']), settings.NUMBER_POST)
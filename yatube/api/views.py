@@ -0,0 +1,135 @@
+from functools import wraps
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.http import Http404, JsonResponse
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils.http import urlencode
+from django.views.decorators.http import condition, require_safe
+from django.views.decorators.vary import vary_on_cookie
+
+from posts.caching import make_etag
+from posts.models import Comment, Group, Post
+from posts.paginators import CursorPaginator
+from posts.timeline import follow_version, get_follow_page
+
+from .serializers import serialize_comment, serialize_post
+
+User = get_user_model()
+JSON_PARAMS = {'ensure_ascii': False, 'separators': (',', ':')}
+
+
+def json_response(data, status=200):
+    return JsonResponse(data, status=status, json_dumps_params=JSON_PARAMS)
+
+
+def api_view(etag_func):
+    """Только чтение, ошибки в JSON и 304 по If-None-Match.
+
+    ETag считается до обращения к базе, поэтому клиент, который
+    опрашивает неизменную ленту, получает 304 без единого запроса.
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            try:
+                return view_func(request, *args, **kwargs)
+            except Http404:
+                return json_response({'detail': 'Не найдено'}, status=404)
+        return require_safe(condition(etag_func=etag_func)(wrapper))
+    return decorator
+
+
+def content_etag(request, *args, **kwargs):
+    return make_etag(request)
+
+
+def follow_etag(request):
+    if not request.user.is_authenticated:
+        return None
+    # Подписки меняют ленту, но не поколение контента.
+    return make_etag(request, request.user.pk, *follow_version(request.user))
+
+
+def get_page(request, queryset, field='pub_date', per_page=None):
+    paginator = CursorPaginator(
+        queryset, per_page or settings.NUMBER_POST, field=field)
+    return paginator.page_after(request.GET.get('after'))
+
+
+def next_url(request, page, path=None):
+    if not page.has_next():
+        return None
+    return request.build_absolute_uri(
+        f'{path or request.path}?{urlencode({"after": page.next_cursor})}')
+
+
+def posts_response(request, queryset):
+    return page_response(request, get_page(request, queryset.feed()))
+
+
+def page_response(request, page):
+    return json_response({
+        'results': [serialize_post(request, post) for post in page],
+        'next': next_url(request, page),
+    })
+
+
+def comments_page(request, post_id):
+    return get_page(
+        request,
+        Comment.objects.filter(post_id=post_id).select_related('author'),
+        field='created',
+        per_page=settings.NUMBER_COMMENTS,
+    )
+
+
+@api_view(content_etag)
+def index(request):
+    return posts_response(request, Post.objects.all())
+
+
+@api_view(content_etag)
+def group_posts(request, slug):
+    group = get_object_or_404(Group, slug=slug)
+    return posts_response(request, group.posts.all())
+
+
+@api_view(content_etag)
+def profile(request, username):
+    author = get_object_or_404(User, username=username)
+    return posts_response(request, author.posts.all())
+
+
+@api_view(content_etag)
+def post_detail(request, post_id):
+    post = get_object_or_404(Post.objects.feed(), id=post_id)
+    # Первая страница комментариев идёт вместе с постом.
+    page = comments_page(request, post.id)
+    return json_response({
+        'post': serialize_post(request, post),
+        'comments': [serialize_comment(comment) for comment in page],
+        'next': next_url(request, page, reverse(
+            'api:post_comments', kwargs={'post_id': post.id})),
+    })
+
+
+@api_view(content_etag)
+def post_comments(request, post_id):
+    get_object_or_404(Post.objects.only('id'), id=post_id)
+    page = comments_page(request, post_id)
+    return json_response({
+        'results': [serialize_comment(comment) for comment in page],
+        'next': next_url(request, page),
+    })
+
+
+@vary_on_cookie
+@api_view(follow_etag)
+def follow_index(request):
+    if not request.user.is_authenticated:
+        return json_response(
+            {'detail': 'Требуется авторизация'}, status=401)
+    return page_response(
+        request, get_follow_page(request.user, request.GET.get('after')))
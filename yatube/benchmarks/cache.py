@@ -0,0 +1,59 @@
+"""Сравнение бэкендов кэша на операциях лент.
+
+Значение размером со страницу ленты читается и пишется, счётчик
+поколения увеличивается через incr. Каждый бэкенд работает
+со своим временным каталогом.
+"""
+import os
+import tempfile
+import time
+
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.cache.backends.locmem import LocMemCache
+
+from core.mmapcache import MmapCache
+
+from .runner import percentile
+
+
+def get_backends(directory):
+    return {
+        'locmem': LocMemCache('bench', {}),
+        'filebased': FileBasedCache(os.path.join(directory, 'files'), {}),
+        'mmap': MmapCache(os.path.join(directory, 'bench.cache'), {}),
+    }
+
+
+def timed(operation, iterations):
+    timings = []
+    for number in range(iterations):
+        started = time.perf_counter()
+        operation(number)
+        timings.append((time.perf_counter() - started) * 1e6)
+    return {
+        'p50_us': round(percentile(timings, 50), 1),
+        'p95_us': round(percentile(timings, 95), 1),
+    }
+
+
+def measure(cache, value, iterations, keys):
+    cache.clear()
+    cache.set('counter', 0)
+    return {
+        'set': timed(
+            lambda number: cache.set(f'page:{number % keys}', value),
+            iterations),
+        'get': timed(
+            lambda number: cache.get(f'page:{number % keys}'), iterations),
+        'incr': timed(lambda number: cache.incr('counter'), iterations),
+    }
+
+
+def run(iterations=1000, value_size=20 * 1024, keys=100):
+    """{бэкенд: {операция: перцентили в микросекундах}}."""
+    value = os.urandom(value_size)
+    with tempfile.TemporaryDirectory() as directory:
+        return {
+            name: measure(cache, value, iterations, keys)
+            for name, cache in get_backends(directory).items()
+        }
@@ -0,0 +1,117 @@
+"""Конкурентные чтение и запись в одну базу SQLite.
+
+Потоки ходят тестовым клиентом и после каждого запроса вызывают
+close_old_connections, как это делает WSGI-сервер: так CONN_MAX_AGE
+влияет на результат так же, как под gunicorn.
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.db import OperationalError, close_old_connections, connections
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from .runner import get_fixtures, get_scenarios, percentile, send
+
+READS = ('profile', 'post_detail', 'follow_index')
+WRITES = ('post_create', 'add_comment')
+
+
+def get_profiles():
+    """Профиль -> (PRAGMA, CONN_MAX_AGE)."""
+    return {
+        # Настройки SQLite и Django по умолчанию.
+        'default': ({'journal_mode': 'delete', 'synchronous': 'full'}, 0),
+        'production': (
+            settings.SQLITE_PRAGMAS,
+            settings.DATABASES['default'].get('CONN_MAX_AGE', 0),
+        ),
+    }
+
+
+def worker(requests, user, deadline, timings, errors):
+    client = Client()
+    if user is not None:
+        client.force_login(user)
+    try:
+        while time.monotonic() < deadline:
+            for method, url, data in requests:
+                started = time.perf_counter()
+                try:
+                    send(getattr(client, method), url, data)
+                except OperationalError:
+                    # database is locked: писатель не дождался блокировки.
+                    errors.append(url)
+                else:
+                    timings.append((time.perf_counter() - started) * 1000)
+                close_old_connections()
+    finally:
+        connections.close_all()
+
+
+def get_requests(scenarios, names, fixtures):
+    """Запросы потока и пользователь, от имени которого они идут."""
+    requests = []
+    for name in names:
+        _, method, kwargs, data = scenarios[name]
+        url = reverse(f'posts:{name}', kwargs=kwargs)
+        requests.append((method, url, data))
+    # Все маршруты группы ходят одним клиентом (reader).
+    return requests, fixtures.get(scenarios[names[0]][0])
+
+
+def summarize(timings, errors, duration):
+    result = {
+        'requests': len(timings),
+        'per_second': round(len(timings) / duration, 1),
+        'errors': len(errors),
+    }
+    if timings:
+        result.update(
+            p50_ms=round(percentile(timings, 50), 3),
+            p95_ms=round(percentile(timings, 95), 3),
+        )
+    return result
+
+
+def run_profile(pragmas, conn_max_age, readers=4, writers=2, duration=5):
+    fixtures = get_fixtures()
+    scenarios = get_scenarios(fixtures)
+    reads, reader = get_requests(scenarios, READS, fixtures)
+    writes, writer = get_requests(scenarios, WRITES, fixtures)
+    database = connections.databases['default']
+    previous = database.get('CONN_MAX_AGE', 0)
+    read_timings, read_errors = [], []
+    write_timings, write_errors = [], []
+    # Режим журнала меняется только без других открытых соединений.
+    connections.close_all()
+    database['CONN_MAX_AGE'] = conn_max_age
+    try:
+        with override_settings(SQLITE_PRAGMAS=pragmas):
+            # Первое соединение переключает журнал, пока оно одно.
+            connections['default'].ensure_connection()
+            deadline = time.monotonic() + duration
+            threads = [
+                threading.Thread(target=worker, args=(
+                    reads, reader, deadline, read_timings, read_errors))
+                for _ in range(readers)
+            ] + [
+                threading.Thread(target=worker, args=(
+                    writes, writer, deadline, write_timings, write_errors))
+                for _ in range(writers)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            connections.close_all()
+    finally:
+        database['CONN_MAX_AGE'] = previous
+    return {
+        'pragmas': pragmas,
+        'conn_max_age': conn_max_age,
+        'reads': summarize(read_timings, read_errors, duration),
+        'writes': summarize(write_timings, write_errors, duration),
+    }
@@ -0,0 +1,103 @@
+"""Планы запросов каждого маршрута posts.urls.
+
+Маршруты вызываются тестовым клиентом в транзакции, которая
+откатывается, поэтому пишущие вьюхи не меняют данные.
+"""
+from django.db import connection, transaction
+from django.urls import reverse
+
+from posts.caching import bump_generation
+
+from .runner import (
+    PREPARE, WRITES, get_clients, get_fixtures, get_scenarios, send,
+)
+
+
+# Сортировки, которые индекс не убирает: (маршрут, проблема) -> причина.
+EXPECTED = {
+    ('search', 'сортировка без индекса'): (
+        'результаты поиска упорядочены по релевантности'),
+}
+
+
+# Статистика планировщика мала, и её просмотр целиком - не проблема.
+CATALOGS = ('sqlite_stat1', 'pg_class')
+
+
+class QueryLog:
+    """execute_wrapper, запоминающий выполненные SELECT с параметрами."""
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        result = execute(sql, params, many, context)
+        if (not many and sql.lstrip().upper().startswith('SELECT')
+                and not any(table in sql for table in CATALOGS)):
+            self.queries.append((sql, params))
+        return result
+
+
+def explain(sql, params):
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            return [row[-1] for row in cursor.fetchall()]
+        cursor.execute(f'EXPLAIN {sql}', params)
+        return [row[0] for row in cursor.fetchall()]
+
+
+def find_problem(line):
+    """Описание проблемы в строке плана или None."""
+    if connection.vendor == 'sqlite':
+        if 'USE TEMP B-TREE' in line:
+            return 'сортировка без индекса'
+        if line.startswith('SCAN') and not any(
+                marker in line
+                for marker in ('INDEX', 'VIRTUAL TABLE', 'CONSTANT ROW')):
+            return 'полный просмотр таблицы'
+    else:
+        if 'Seq Scan' in line:
+            return 'полный просмотр таблицы'
+        if line.lstrip(' ->').startswith('Sort '):
+            return 'сортировка без индекса'
+    return None
+
+
+def collect_plans(names=None):
+    """{маршрут: [{sql, plan, problems}]} для запросов каждой вьюхи."""
+    fixtures = get_fixtures()
+    clients = get_clients(fixtures)
+    scenarios = get_scenarios(fixtures)
+    report = {}
+    with transaction.atomic():
+        for name in sorted(scenarios, key=lambda name: name in WRITES):
+            if names and name not in names:
+                continue
+            role, method, kwargs, data = scenarios[name]
+            client = clients[role]
+            if name in PREPARE:
+                send(client.get, reverse(
+                    f'posts:{PREPARE[name]}', kwargs=kwargs), None)
+            # Страницы лент не должны прийти из кэша.
+            bump_generation()
+            log = QueryLog()
+            with connection.execute_wrapper(log):
+                send(getattr(client, method), reverse(
+                    f'posts:{name}', kwargs=kwargs), data)
+            report[name] = []
+            for sql, params in log.queries:
+                plan = explain(sql, params)
+                problems = set(filter(None, map(find_problem, plan)))
+                report[name].append({
+                    'sql': sql,
+                    'plan': plan,
+                    'problems': sorted(
+                        problem for problem in problems
+                        if (name, problem) not in EXPECTED),
+                    'expected': sorted(
+                        EXPECTED[name, problem] for problem in problems
+                        if (name, problem) in EXPECTED),
+                })
+        transaction.set_rollback(True)
+    return report
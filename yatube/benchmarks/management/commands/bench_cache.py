@@ -0,0 +1,44 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from benchmarks.cache import run
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает LocMemCache, FileBasedCache и общий кэш в памяти '
+        'на чтении, записи и incr.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=1000)
+        parser.add_argument(
+            '--value-size', type=int, default=20 * 1024,
+            help='Размер значения в байтах, по умолчанию - как у страницы.',
+        )
+        parser.add_argument(
+            '--keys', type=int, default=100,
+            help='Сколько разных ключей читать и писать.',
+        )
+        parser.add_argument('--output', help='Файл для результатов JSON.')
+
+    def handle(self, *args, **options):
+        if options['iterations'] < 1 or options['keys'] < 1:
+            raise CommandError(
+                '--iterations и --keys должны быть больше нуля')
+        report = run(
+            iterations=options['iterations'],
+            value_size=options['value_size'],
+            keys=options['keys'],
+        )
+        for name, operations in report.items():
+            for operation, result in operations.items():
+                self.stdout.write(
+                    f'{name:<10} {operation:<5}'
+                    f'p50 {result["p50_us"]:9.1f} мкс  '
+                    f'p95 {result["p95_us"]:9.1f} мкс'
+                )
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as output:
+                json.dump(report, output, ensure_ascii=False, indent=2)
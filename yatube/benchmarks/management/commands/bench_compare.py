@@ -0,0 +1,40 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+METRICS = ('p50_ms', 'p95_ms', 'p99_ms', 'queries', 'memory_kib')
+
+
+def change(before, after):
+    if before is None or after is None:
+        return '-'
+    if not before:
+        return f'{after:+}'
+    return f'{(after - before) / before:+.0%}'
+
+
+class Command(BaseCommand):
+    help = 'Сравнивает два файла bench_run, например до и после коммита.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('baseline')
+        parser.add_argument('candidate')
+
+    def handle(self, *args, **options):
+        reports = []
+        for path in (options['baseline'], options['candidate']):
+            with open(path, encoding='utf-8') as source:
+                reports.append(json.load(source))
+        baseline, candidate = reports
+        self.stdout.write(
+            f'{baseline.get("commit")} -> {candidate.get("commit")}')
+        self.stdout.write(
+            f'{"маршрут":<17}' + ''.join(f'{name:>14}' for name in METRICS))
+        for name, after in candidate['routes'].items():
+            before = baseline['routes'].get(name)
+            if before is None:
+                continue
+            self.stdout.write(f'{name:<17}' + ''.join(
+                f'{change(before.get(metric), after.get(metric)):>14}'
+                for metric in METRICS
+            ))
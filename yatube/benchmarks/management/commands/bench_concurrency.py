@@ -0,0 +1,59 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from benchmarks.concurrency import get_profiles, run_profile
+from benchmarks.runner import FixtureError
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает пропускную способность чтения и записи из '
+        'нескольких потоков при разных настройках SQLite.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'profiles', nargs='*', default=['default', 'production'],
+            help='Профили: default (журнал отката) и production (WAL).',
+        )
+        parser.add_argument('--readers', type=int, default=4)
+        parser.add_argument('--writers', type=int, default=2)
+        parser.add_argument(
+            '--duration', type=float, default=5,
+            help='Длительность прогона профиля в секундах.',
+        )
+        parser.add_argument('--output', help='Файл для результатов JSON.')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('Сравнение профилей имеет смысл для SQLite')
+        profiles = get_profiles()
+        unknown = set(options['profiles']) - set(profiles)
+        if unknown:
+            raise CommandError(
+                f'Неизвестные профили: {", ".join(sorted(unknown))}')
+        report = {}
+        for name in options['profiles']:
+            pragmas, conn_max_age = profiles[name]
+            try:
+                report[name] = run_profile(
+                    pragmas, conn_max_age,
+                    readers=options['readers'],
+                    writers=options['writers'],
+                    duration=options['duration'],
+                )
+            except FixtureError as error:
+                raise CommandError(error)
+            for kind in ('reads', 'writes'):
+                result = report[name][kind]
+                self.stdout.write(
+                    f'{name:<11} {kind:<6} '
+                    f'{result["per_second"]:8.1f} в секунду  '
+                    f'p95 {result.get("p95_ms", 0):8.2f} мс  '
+                    f'ошибок {result["errors"]}'
+                )
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as output:
+                json.dump(report, output, ensure_ascii=False, indent=2)
@@ -0,0 +1,38 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from benchmarks.pagination import run
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает время рендеринга и размер пагинатора со ссылкой '
+        'на каждую страницу и с сокращённым списком страниц.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'pages', nargs='*', type=int, default=[10, 1000, 50000],
+            help='Число страниц в ленте.',
+        )
+        parser.add_argument('--iterations', type=int, default=20)
+        parser.add_argument('--output', help='Файл для результатов JSON.')
+
+    def handle(self, *args, **options):
+        if options['iterations'] < 1:
+            raise CommandError('--iterations должно быть больше нуля')
+        if any(pages < 1 for pages in options['pages']):
+            raise CommandError('Число страниц должно быть больше нуля')
+        report = run(options['pages'], iterations=options['iterations'])
+        for num_pages, results in report.items():
+            for name, result in results.items():
+                self.stdout.write(
+                    f'{num_pages:>8} страниц  {name:<7}'
+                    f'p50 {result["p50_ms"]:9.3f} мс  '
+                    f'p95 {result["p95_ms"]:9.3f} мс  '
+                    f'{result["bytes"]:>10} байт'
+                )
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as output:
+                json.dump(report, output, ensure_ascii=False, indent=2)
@@ -0,0 +1,56 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from benchmarks.runner import FixtureError, route_names, run
+
+
+class Command(BaseCommand):
+    help = (
+        'Прогоняет маршруты posts.urls через тестовый клиент и сохраняет '
+        'перцентили задержки, число запросов и память в JSON.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'routes', nargs='*',
+            help='Маршруты для замера; по умолчанию - все.',
+        )
+        parser.add_argument('--iterations', type=int, default=50)
+        parser.add_argument('--warmup', type=int, default=5)
+        parser.add_argument(
+            '--memory-iterations', type=int, default=5,
+            help='Запросов под tracemalloc; 0 - не мерить память.',
+        )
+        parser.add_argument(
+            '--cold', action='store_true',
+            help='Очищать кэш перед каждым запросом.',
+        )
+        parser.add_argument(
+            '--output', default='benchmark.json',
+            help='Файл для результатов.',
+        )
+
+    def handle(self, *args, **options):
+        unknown = set(options['routes']) - set(route_names())
+        if unknown:
+            raise CommandError(
+                f'Неизвестные маршруты: {", ".join(sorted(unknown))}')
+        if options['iterations'] < 1:
+            raise CommandError('--iterations должно быть больше нуля')
+        try:
+            report = run(
+                names=options['routes'],
+                iterations=options['iterations'],
+                warmup=options['warmup'],
+                memory_iterations=options['memory_iterations'],
+                cold=options['cold'],
+                log=self.stdout.write,
+            )
+        except FixtureError as error:
+            raise CommandError(error)
+        with open(options['output'], 'w', encoding='utf-8') as output:
+            json.dump(report, output, ensure_ascii=False, indent=2)
+        self.stdout.write(self.style.SUCCESS(
+            f'Результаты сохранены в {options["output"]}'
+        ))
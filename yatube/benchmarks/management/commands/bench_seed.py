@@ -0,0 +1,62 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from benchmarks.seed import bench_users, flush, seed
+
+
+class Command(BaseCommand):
+    help = (
+        'Создаёт синтетический набор данных для нагрузочных тестов: '
+        'пользователи, группы, посты с картинками, комментарии '
+        'и подписки со степенным распределением.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--groups', type=int, default=50)
+        parser.add_argument('--posts', type=int, default=100000)
+        parser.add_argument('--comments', type=int, default=100000)
+        parser.add_argument(
+            '--follows', type=int, default=20,
+            help='Сколько авторов выбирает каждый пользователь.',
+        )
+        parser.add_argument(
+            '--images', type=int, default=20,
+            help='Сколько разных картинок сгенерировать.',
+        )
+        parser.add_argument(
+            '--image-share', type=float, default=0.2,
+            help='Доля постов с картинкой.',
+        )
+        parser.add_argument(
+            '--alpha', type=float, default=1.2,
+            help='Показатель степенного закона для авторов и подписок.',
+        )
+        parser.add_argument('--days', type=int, default=365)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--flush', action='store_true',
+            help='Удалить данные прошлого прогона.',
+        )
+
+    def handle(self, *args, **options):
+        if options['flush']:
+            flush()
+        elif bench_users().exists():
+            raise CommandError(
+                'Набор уже создан: добавьте --flush, чтобы пересоздать')
+        seed(
+            users=options['users'],
+            groups=options['groups'],
+            posts=options['posts'],
+            comments=options['comments'],
+            follows=options['follows'],
+            images=options['images'],
+            image_share=options['image_share'],
+            alpha=options['alpha'],
+            days=options['days'],
+            batch_size=options['batch_size'],
+            random_seed=options['seed'],
+            log=self.stdout.write,
+        )
+        self.stdout.write(self.style.SUCCESS('Набор данных готов'))
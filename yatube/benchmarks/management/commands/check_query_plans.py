@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from benchmarks.explain import collect_plans
+from benchmarks.runner import FixtureError
+
+
+class Command(BaseCommand):
+    help = (
+        'Выполняет EXPLAIN для запросов каждого маршрута posts.urls '
+        'и падает, если запрос просматривает таблицу или сортирует '
+        'без индекса.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'routes', nargs='*', help='По умолчанию - все маршруты.')
+        parser.add_argument(
+            '--verbose-plans', action='store_true',
+            help='Печатать планы всех запросов, а не только проблемных.',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            report = collect_plans(options['routes'])
+        except FixtureError as error:
+            raise CommandError(error)
+        failed = 0
+        for name, queries in report.items():
+            problems = sum(bool(query['problems']) for query in queries)
+            failed += problems
+            style = self.style.ERROR if problems else self.style.SUCCESS
+            self.stdout.write(style(
+                f'{name}: запросов {len(queries)}, проблемных {problems}'))
+            for query in queries:
+                for reason in query['expected']:
+                    self.stdout.write(f'  ожидаемо: {reason}')
+                if not (query['problems'] or options['verbose_plans']):
+                    continue
+                self.stdout.write(f'  {query["sql"]}')
+                for line in query['plan']:
+                    self.stdout.write(f'    {line}')
+        if failed:
+            raise CommandError(f'Запросов без подходящего индекса: {failed}')
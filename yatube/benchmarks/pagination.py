@@ -0,0 +1,61 @@
+"""Время рендеринга пагинатора при большом числе страниц.
+
+Базой служит прежний шаблон со ссылкой на каждую страницу:
+он показывает, сколько стоил page_range на глубокой ленте.
+Данные из базы не нужны, пагинатор строится по range.
+"""
+import time
+
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.template.loader import get_template
+
+from .runner import percentile
+
+FULL_RANGE = '''
+{% for i in page_obj.paginator.page_range %}
+  {% if page_obj.number == i %}
+    <li class="page-item active"><span class="page-link">{{ i }}</span></li>
+  {% else %}
+    <li class="page-item">
+      <a class="page-link" href="?{{ page_query }}page={{ i }}">{{ i }}</a>
+    </li>
+  {% endif %}
+{% endfor %}
+'''
+
+
+def get_templates():
+    elided = get_template('posts/includes/paginator.html')
+    return {
+        'full': elided.backend.from_string(FULL_RANGE),
+        'elided': elided,
+    }
+
+
+def measure(template, page_obj, iterations):
+    timings = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        html = template.render({'page_obj': page_obj})
+        timings.append((time.perf_counter() - started) * 1000)
+    return {
+        'p50_ms': round(percentile(timings, 50), 3),
+        'p95_ms': round(percentile(timings, 95), 3),
+        'bytes': len(html.encode()),
+    }
+
+
+def run(page_counts, iterations=20):
+    """{число страниц: {шаблон: замеры}}; открыта средняя страница."""
+    templates = get_templates()
+    report = {}
+    for num_pages in page_counts:
+        paginator = Paginator(
+            range(num_pages * settings.NUMBER_POST), settings.NUMBER_POST)
+        page_obj = paginator.get_page(num_pages // 2 + 1)
+        report[num_pages] = {
+            name: measure(template, page_obj, iterations)
+            for name, template in templates.items()
+        }
+    return report
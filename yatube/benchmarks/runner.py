@@ -0,0 +1,233 @@
+"""Прогон всех маршрутов posts.urls через тестовый клиент Django.
+
+Задержка и число запросов снимаются в одном проходе, память -
+в отдельном: tracemalloc заметно замедляет интерпретатор.
+"""
+import math
+import platform
+import statistics
+import subprocess
+import time
+import tracemalloc
+from functools import partial
+
+import django
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from posts.models import Comment, Follow, Group, Post
+from posts.urls import urlpatterns
+
+from .seed import STAFF_USERNAME, bench_groups, bench_users
+
+# Пишущие маршруты идут последними, чтобы не менять данные для чтения.
+WRITES = ('post_create', 'add_comment', 'profile_follow', 'profile_unfollow')
+PERCENTILES = (50, 95, 99)
+# Отписаться можно только от автора, на которого подписан.
+PREPARE = {'profile_unfollow': 'profile_follow'}
+
+
+class FixtureError(Exception):
+    pass
+
+
+def get_fixtures():
+    """Выбирает самые тяжёлые объекты набора: их страницы и меряем."""
+    users = bench_users().exclude(username=STAFF_USERNAME)
+    author = users.order_by('-stats__followers_count', 'pk').first()
+    group = bench_groups().order_by('-posts_count', 'pk').first()
+    if author is None or group is None:
+        raise FixtureError('Нет данных: сначала запустите bench_seed')
+    reader = users.exclude(pk=author.pk).order_by(
+        '-stats__following_count', 'pk').first()
+    stranger = users.exclude(pk__in=[author.pk, reader.pk]).exclude(
+        following__user=reader).order_by('stats__followers_count').first()
+    post = Post.objects.filter(author=author).order_by(
+        '-comments_count').first() or Post.objects.filter(
+        author_id__in=users).first()
+    return {
+        'author': author,
+        'reader': reader,
+        'stranger': stranger or author,
+        'staff': bench_users().get(username=STAFF_USERNAME),
+        'group': group,
+        'post': post,
+    }
+
+
+def get_scenarios(fixtures):
+    """Маршрут -> (клиент, метод, аргументы URL, данные запроса).
+
+    Маршрут из PREPARE вызывается перед каждым замером вне таймера.
+    """
+    post = {'post_id': fixtures['post'].pk}
+    author = {'username': fixtures['author'].username}
+    group = {'slug': fixtures['group'].slug}
+    stranger = {'username': fixtures['stranger'].username}
+    return {
+        'index': ('guest', 'get', {}, None),
+        'group_list': ('guest', 'get', group, None),
+        'profile': ('reader', 'get', author, None),
+        'post_detail': ('reader', 'get', post, None),
+        'post_comments': ('guest', 'get', post, None),
+        'follow_index': ('reader', 'get', {}, None),
+        'search': ('guest', 'get', {}, {'q': 'война мир'}),
+        'post_edit': ('author', 'get', post, None),
+        'profile_export': ('author', 'get', author, None),
+        'group_export': ('staff', 'get', group, None),
+        'post_create': (
+            'reader', 'post', {}, {'text': 'Нагрузочный пост'}),
+        'add_comment': (
+            'reader', 'post', post, {'text': 'Нагрузочный комментарий'}),
+        'profile_follow': ('reader', 'get', stranger, None),
+        'profile_unfollow': ('reader', 'get', stranger, None),
+    }
+
+
+def get_clients(fixtures):
+    clients = {'guest': Client()}
+    for role in ('reader', 'author', 'staff'):
+        clients[role] = Client()
+        clients[role].force_login(fixtures[role])
+    return clients
+
+
+def percentile(values, rank):
+    """Перцентиль по ближайшему рангу."""
+    ordered = sorted(values)
+    index = max(math.ceil(rank / 100 * len(ordered)) - 1, 0)
+    return ordered[index]
+
+
+def send(method, url, data):
+    response = method(url, data or {})
+    if response.streaming:
+        for _ in response.streaming_content:
+            pass
+    return response
+
+
+def measure(method, url, data, iterations, warmup, memory_iterations,
+            cold=False, prepare=None):
+    def before():
+        if prepare is not None:
+            prepare()
+        if cold:
+            cache.clear()
+
+    for _ in range(warmup):
+        before()
+        send(method, url, data)
+    timings, queries, statuses = [], [], set()
+    for _ in range(iterations):
+        before()
+        with CaptureQueriesContext(connection) as context:
+            started = time.perf_counter()
+            response = send(method, url, data)
+            timings.append((time.perf_counter() - started) * 1000)
+        queries.append(len(context))
+        statuses.add(response.status_code)
+    peaks = []
+    for _ in range(memory_iterations):
+        before()
+        tracemalloc.start()
+        try:
+            send(method, url, data)
+            peaks.append(tracemalloc.get_traced_memory()[1])
+        finally:
+            tracemalloc.stop()
+    result = {
+        f'p{rank}_ms': round(percentile(timings, rank), 3)
+        for rank in PERCENTILES
+    }
+    result.update(
+        mean_ms=round(statistics.mean(timings), 3),
+        queries=statistics.median_low(queries),
+        queries_max=max(queries),
+        memory_kib=(
+            round(statistics.median_low(peaks) / 1024, 1) if peaks else None
+        ),
+        statuses=sorted(statuses),
+    )
+    return result
+
+
+def get_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=settings.BASE_DIR, capture_output=True, text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def describe_dataset():
+    return {
+        'users': bench_users().count(),
+        'groups': Group.objects.count(),
+        'posts': Post.objects.count(),
+        'comments': Comment.objects.count(),
+        'follows': Follow.objects.count(),
+    }
+
+
+def run(names=None, iterations=50, warmup=5, memory_iterations=5,
+        cold=False, log=print):
+    """Меряет маршруты и возвращает отчёт, готовый к json.dump."""
+    fixtures = get_fixtures()
+    clients = get_clients(fixtures)
+    scenarios = get_scenarios(fixtures)
+    order = sorted(scenarios, key=lambda name: name in WRITES)
+    routes = {}
+    for name in order:
+        if names and name not in names:
+            continue
+        client, method, kwargs, data = scenarios[name]
+        url = reverse(f'posts:{name}', kwargs=kwargs)
+        prepare = None
+        if name in PREPARE:
+            prepare = partial(
+                send, clients[client].get,
+                reverse(f'posts:{PREPARE[name]}', kwargs=kwargs), None,
+            )
+        routes[name] = measure(
+            getattr(clients[client], method), url, data,
+            iterations, warmup, memory_iterations, cold, prepare,
+        )
+        log(format_result(name, routes[name]))
+    return {
+        'commit': get_commit(),
+        'created': timezone.now().isoformat(),
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'database': connection.vendor,
+        'options': {
+            'iterations': iterations,
+            'warmup': warmup,
+            'memory_iterations': memory_iterations,
+            'cold': cold,
+        },
+        'dataset': describe_dataset(),
+        'routes': routes,
+    }
+
+
+def format_result(name, result):
+    return (
+        f'{name:<17} p50 {result["p50_ms"]:8.2f} мс  '
+        f'p95 {result["p95_ms"]:8.2f} мс  p99 {result["p99_ms"]:8.2f} мс  '
+        f'запросов {result["queries"]:>3}  '
+        f'память {result["memory_kib"] or 0:>8.1f} КиБ  '
+        f'{",".join(map(str, result["statuses"]))}'
+    )
+
+
+def route_names():
+    return [pattern.name for pattern in urlpatterns]
@@ -0,0 +1,188 @@
+"""Синтетические данные для нагрузочных тестов.
+
+Все объекты помечены префиксом PREFIX, поэтому их можно удалить,
+не трогая настоящих пользователей и группы.
+"""
+import io
+import random
+from datetime import timedelta
+from itertools import accumulate
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.utils import timezone
+from PIL import Image
+
+from posts.maintenance import rebuild_derived_data, supplied_timestamps
+from posts.models import Comment, Follow, Group, Post
+from posts.thumbnails import render_thumbnail
+
+User = get_user_model()
+
+PREFIX = 'bench'
+STAFF_USERNAME = f'{PREFIX}_staff'
+WORDS = (
+    'лев', 'толстой', 'война', 'мир', 'пост', 'лента', 'группа',
+    'подписка', 'москва', 'город', 'утро', 'вечер', 'книга', 'кино',
+    'музыка', 'дорога', 'море', 'снег', 'кофе', 'работа',
+)
+
+
+def bench_users():
+    return User.objects.filter(username__startswith=f'{PREFIX}_')
+
+
+def bench_groups():
+    return Group.objects.filter(slug__startswith=f'{PREFIX}-')
+
+
+def flush():
+    """Удаляет данные прошлого прогона; посты уходят каскадом."""
+    bench_users().delete()
+    bench_groups().delete()
+
+
+def power_law_weights(size, alpha):
+    """Накопленные веса Ципфа: i-й элемент выбирается с весом 1/i^alpha."""
+    return list(accumulate(1 / rank ** alpha for rank in range(1, size + 1)))
+
+
+def make_images(count, rng):
+    """Сохраняет count разноцветных JPEG и строит для них миниатюры."""
+    images = []
+    for number in range(count):
+        color = tuple(rng.randrange(256) for _ in range(3))
+        buffer = io.BytesIO()
+        Image.new('RGB', (1200, 800), color).save(buffer, 'JPEG')
+        name = default_storage.save(
+            f'posts/{PREFIX}_{number}.jpg', ContentFile(buffer.getvalue()))
+        images.append((name, render_thumbnail(name)))
+    return images
+
+
+def text(rng, words):
+    return ' '.join(rng.choice(WORDS) for _ in range(words)).capitalize()
+
+
+def create_in_batches(model, objects, batch_size):
+    """bulk_create поверх генератора: в памяти не больше одной пачки."""
+    created = 0
+    batch = []
+    for obj in objects:
+        batch.append(obj)
+        if len(batch) == batch_size:
+            with transaction.atomic():
+                model.objects.bulk_create(batch)
+            created += len(batch)
+            batch = []
+    if batch:
+        with transaction.atomic():
+            model.objects.bulk_create(batch)
+        created += len(batch)
+    return created
+
+
+def seed(users=1000, groups=50, posts=100000, comments=100000,
+         follows=20, images=20, image_share=0.2, alpha=1.2, days=365,
+         batch_size=5000, random_seed=0, log=print):
+    """Создаёт набор данных и пересобирает производные таблицы.
+
+    Авторство постов и подписки распределены по степенному закону:
+    немногие авторы пишут большую часть постов и собирают
+    большую часть подписчиков, как в живой соцсети.
+    """
+    rng = random.Random(random_seed)
+    password = make_password(None)
+
+    User.objects.bulk_create(
+        [User(username=STAFF_USERNAME, password=password, is_staff=True)]
+        + [
+            User(
+                username=f'{PREFIX}_user_{number}',
+                first_name=rng.choice(WORDS).capitalize(),
+                password=password,
+            )
+            for number in range(users)
+        ],
+        batch_size=batch_size,
+    )
+    user_ids = list(bench_users().exclude(
+        username=STAFF_USERNAME).order_by('pk').values_list('pk', flat=True))
+    rng.shuffle(user_ids)
+    log(f'Пользователей: {len(user_ids)}')
+
+    Group.objects.bulk_create([
+        Group(
+            title=f'Группа {number}',
+            slug=f'{PREFIX}-group-{number}',
+            description=text(rng, 10),
+        )
+        for number in range(groups)
+    ])
+    group_ids = list(bench_groups().values_list('pk', flat=True))
+    log(f'Групп: {len(group_ids)}')
+
+    weights = power_law_weights(len(user_ids), alpha)
+    pictures = make_images(images, rng) if image_share else []
+    log(f'Картинок: {len(pictures)}')
+
+    started = timezone.now() - timedelta(days=days)
+    step = timedelta(days=days) / max(posts, 1)
+
+    def generate_posts():
+        for number in range(posts):
+            image = thumbnail = ''
+            if pictures and rng.random() < image_share:
+                image, thumbnail = rng.choice(pictures)
+            yield Post(
+                text=text(rng, rng.randint(5, 60)),
+                pub_date=started + step * number,
+                author_id=rng.choices(user_ids, cum_weights=weights)[0],
+                group_id=(
+                    rng.choice(group_ids)
+                    if group_ids and rng.random() < 0.7 else None
+                ),
+                image=image,
+                thumbnail=thumbnail,
+            )
+
+    with supplied_timestamps(Post):
+        log(f'Постов: {create_in_batches(Post, generate_posts(), batch_size)}')
+
+    post_ids = Post.objects.filter(author_id__in=bench_users()).order_by(
+        'pk').values_list('pk', 'pub_date')
+    bounds = (post_ids.first(), post_ids.last())
+
+    def generate_comments():
+        if bounds[0] is None:
+            return
+        (first, pub_date), (last, _) = bounds
+        for _ in range(comments):
+            # Посты вставлены одной серией, их pk идут подряд.
+            yield Comment(
+                post_id=rng.randint(first, last),
+                author_id=rng.choice(user_ids),
+                text=text(rng, rng.randint(3, 20)),
+                created=pub_date + step * rng.randint(0, posts),
+            )
+
+    with supplied_timestamps(Comment):
+        log('Комментариев: '
+            f'{create_in_batches(Comment, generate_comments(), batch_size)}')
+
+    def generate_follows():
+        for user_id in user_ids:
+            authors = set(rng.choices(
+                user_ids, cum_weights=weights, k=follows))
+            authors.discard(user_id)
+            for author_id in authors:
+                yield Follow(user_id=user_id, author_id=author_id)
+
+    log('Подписок: '
+        f'{create_in_batches(Follow, generate_follows(), batch_size)}')
+
+    rebuild_derived_data()
+    log('Счётчики, поиск и ленты пересобраны')
@@ -0,0 +1,97 @@
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from posts.models import Follow, Post, Timeline
+
+from ..runner import get_fixtures, get_scenarios, route_names
+from ..seed import bench_users
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, THUMBNAIL_WORKERS=0)
+class BenchmarkTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        call_command(
+            'bench_seed', users=20, groups=3, posts=200, comments=100,
+            follows=5, images=2, image_share=0.5, stdout=StringIO(),
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def test_seed(self):
+        """Набор данных создан, ленты и миниатюры построены."""
+        self.assertEqual(bench_users().count(), 21)
+        self.assertEqual(Post.objects.count(), 200)
+        self.assertTrue(Follow.objects.exists())
+        self.assertTrue(Timeline.objects.exists())
+        self.assertFalse(
+            Post.objects.exclude(image='').filter(thumbnail='').exists())
+
+    def test_every_route_has_scenario(self):
+        """Новый маршрут в posts.urls нужно добавить в нагрузочный тест."""
+        self.assertEqual(
+            set(get_scenarios(get_fixtures())), set(route_names()))
+
+    def test_query_plans(self):
+        """Запросы всех маршрутов идут по индексам."""
+        call_command('check_query_plans', stdout=StringIO())
+        # Пишущие маршруты выполнялись в откатанной транзакции.
+        self.assertFalse(
+            Post.objects.filter(text='Нагрузочный пост').exists())
+
+    def test_run(self):
+        """bench_run сохраняет перцентили по каждому маршруту."""
+        output = os.path.join(TEMP_MEDIA_ROOT, 'benchmark.json')
+        call_command(
+            'bench_run', iterations=2, warmup=0, memory_iterations=1,
+            output=output, stdout=StringIO(),
+        )
+        with open(output, encoding='utf-8') as source:
+            report = json.load(source)
+        self.assertEqual(set(report['routes']), set(route_names()))
+        for name, result in report['routes'].items():
+            with self.subTest(name=name):
+                self.assertLessEqual(result['p50_ms'], result['p99_ms'])
+                self.assertGreater(result['memory_kib'], 0)
+                self.assertTrue(
+                    all(status < 400 for status in result['statuses']))
+
+    def test_pagination(self):
+        """Сокращённый пагинатор не растёт с числом страниц."""
+        output = os.path.join(TEMP_MEDIA_ROOT, 'pagination.json')
+        call_command(
+            'bench_pagination', 10, 1000, iterations=1, output=output,
+            stdout=StringIO(),
+        )
+        with open(output, encoding='utf-8') as source:
+            report = json.load(source)
+        self.assertGreater(
+            report['1000']['full']['bytes'], report['10']['full']['bytes'])
+        self.assertLess(
+            report['1000']['elided']['bytes'],
+            report['10']['elided']['bytes'] * 2,
+        )
+
+    def test_cache(self):
+        """bench_cache меряет все бэкенды на всех операциях."""
+        output = os.path.join(TEMP_MEDIA_ROOT, 'cache.json')
+        call_command(
+            'bench_cache', iterations=5, output=output, stdout=StringIO())
+        with open(output, encoding='utf-8') as source:
+            report = json.load(source)
+        self.assertEqual(set(report), {'locmem', 'filebased', 'mmap'})
+        for operations in report.values():
+            self.assertEqual(set(operations), {'set', 'get', 'incr'})
@@ -0,0 +1,43 @@
+"""Вставка фрагментов отдельного пользователя в общую страницу.
+
+Пока страница рисуется для общего кэша, тег per_user оставляет
+вместо фрагмента метку и запоминает шаблон; при выдаче метки
+заменяются фрагментами, отрисованными для текущего запроса.
+"""
+from django.template.loader import render_to_string
+
+ATTRIBUTE = 'per_user_fragments'
+
+
+def marker(index):
+    return f'<!--per-user:{index}-->'
+
+
+def start_shared_render(request):
+    setattr(request, ATTRIBUTE, [])
+
+
+def finish_shared_render(request):
+    """Возвращает фрагменты страницы: [(шаблон, контекст)]."""
+    return request.__dict__.pop(ATTRIBUTE, [])
+
+
+def defer(request, template_name, extra):
+    """Метка вместо фрагмента или None, если страница не общая."""
+    fragments = getattr(request, ATTRIBUTE, None)
+    if fragments is None:
+        return None
+    fragments.append((template_name, extra))
+    return marker(len(fragments) - 1)
+
+
+def render_fragment(request, template_name, extra):
+    return render_to_string(template_name, extra, request=request)
+
+
+def stitch(request, content, fragments):
+    """Подставляет в общую страницу фрагменты текущего пользователя."""
+    for index, (template_name, extra) in enumerate(fragments):
+        html = render_fragment(request, template_name, extra)
+        content = content.replace(marker(index).encode(), html.encode())
+    return content
@@ -0,0 +1,51 @@
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from sorl.thumbnail.kvstores import cached_db_kvstore
+
+
+class KVStore(cached_db_kvstore.KVStore):
+    """Хранилище метаданных sorl-thumbnail с LRU в памяти процесса.
+
+    Порядок поиска: LRU процесса, общий кэш, база данных. Пустые
+    ответы в LRU не попадают, чтобы миниатюру, построенную другим
+    процессом, было видно через общий кэш.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._lru = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _remember(self, key, value):
+        with self._lock:
+            self._lru[key] = value
+            self._lru.move_to_end(key)
+            while len(self._lru) > settings.THUMBNAIL_KVSTORE_LRU_SIZE:
+                self._lru.popitem(last=False)
+
+    def _get_raw(self, key):
+        with self._lock:
+            if key in self._lru:
+                self._lru.move_to_end(key)
+                return self._lru[key]
+        value = super()._get_raw(key)
+        if value is not None:
+            self._remember(key, value)
+        return value
+
+    def _set_raw(self, key, value):
+        super()._set_raw(key, value)
+        self._remember(key, value)
+
+    def _delete_raw(self, *keys):
+        super()._delete_raw(*keys)
+        with self._lock:
+            for key in keys:
+                self._lru.pop(key, None)
+
+    def clear(self, delete_thumbnails=False):
+        super().clear(delete_thumbnails)
+        with self._lock:
+            self._lru.clear()
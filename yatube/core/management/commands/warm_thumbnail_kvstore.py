@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+from sorl.thumbnail import default
+from sorl.thumbnail.conf import settings
+from sorl.thumbnail.models import KVStore as KVStoreModel
+
+
+class Command(BaseCommand):
+    help = 'Загружает метаданные миниатюр из базы в общий кэш.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size', type=int, default=1000,
+            help='Сколько записей читать из базы за раз.',
+        )
+
+    def handle(self, *args, **options):
+        cache = default.kvstore.cache
+        rows = KVStoreModel.objects.filter(
+            key__startswith=settings.THUMBNAIL_KEY_PREFIX
+        ).order_by('key').values_list('key', 'value')
+        chunk_size = options['chunk_size']
+        last_key = ''
+        total = 0
+        while True:
+            chunk = dict(rows.filter(key__gt=last_key)[:chunk_size])
+            if not chunk:
+                break
+            cache.set_many(chunk, settings.THUMBNAIL_CACHE_TIMEOUT)
+            last_key = max(chunk)
+            total += len(chunk)
+        self.stdout.write(self.style.SUCCESS(
+            f'В кэш загружено записей: {total}'
+        ))
@@ -0,0 +1,283 @@
+"""Метрики запросов в формате Prometheus.
+
+Каждый процесс копит приращения в памяти и раз в
+METRICS_FLUSH_INTERVAL секунд переносит их в общий кэш через incr,
+поэтому /metrics видит сумму по всем воркерам gunicorn.
+"""
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.cache.backends import locmem
+from django.db import connections
+from django.template.backends import django as django_backend
+from django.template.exceptions import TemplateDoesNotExist
+
+from . import mmapcache
+
+VIEWS_KEY = 'metrics:views'
+UNRESOLVED = 'unresolved'
+# Счётчики запроса: имя в кэше -> (метрика Prometheus, множитель).
+# Время хранится в микросекундах, потому что incr работает с целыми.
+COUNTERS = {
+    'requests': ('yatube_requests_total', 1),
+    'queries': ('yatube_db_queries_total', 1),
+    'query_us': ('yatube_db_query_seconds_total', 1e-6),
+    'cache_hits': ('yatube_cache_hits_total', 1),
+    'cache_misses': ('yatube_cache_misses_total', 1),
+    'template_us': ('yatube_template_render_seconds_total', 1e-6),
+    # События кэша лент, см. posts.caching.cache_feed.
+    'feed_hits': ('yatube_feed_cache_hits_total', 1),
+    'feed_misses': ('yatube_feed_cache_misses_total', 1),
+    'feed_stale': ('yatube_feed_cache_stale_total', 1),
+    # Кэш карточек постов, см. posts.templatetags.cards.
+    'card_hits': ('yatube_card_cache_hits_total', 1),
+    'card_misses': ('yatube_card_cache_misses_total', 1),
+}
+HISTOGRAM = 'yatube_request_duration_seconds'
+
+_local = threading.local()
+_missing = object()
+
+
+class Recorder:
+    """Счётчики одного запроса."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.query_time = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.template_time = 0.0
+        self.template_depth = 0
+        self.events = defaultdict(int)
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.query_time += time.perf_counter() - started
+            self.queries += 1
+
+
+def current():
+    return getattr(_local, 'recorder', None)
+
+
+def record_event(name, count=1):
+    """Считает событие текущего запроса; name - ключ COUNTERS."""
+    recorder = current()
+    if recorder is not None:
+        recorder.events[name] += count
+
+
+@contextmanager
+def recording(recorder):
+    """Привязывает счётчики к потоку и ко всем соединениям с базой."""
+    previous = current()
+    _local.recorder = recorder
+    try:
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(recorder))
+            yield recorder
+    finally:
+        _local.recorder = previous
+
+
+@contextmanager
+def detached():
+    previous = current()
+    _local.recorder = None
+    try:
+        yield
+    finally:
+        _local.recorder = previous
+
+
+def metric_key(view, name):
+    return f'metrics:{view}:{name}'
+
+
+def bucket_names():
+    return [f'bucket_{index}' for index in range(
+        len(settings.METRICS_BUCKETS) + 1)]
+
+
+class Registry:
+    """Приращения метрик процесса, ещё не перенесённые в кэш."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pending = defaultdict(int)
+        self.views = set()
+        self.flushed = time.monotonic()
+
+    def add(self, view, recorder):
+        duration = time.perf_counter() - recorder.started
+        bucket = bisect_left(settings.METRICS_BUCKETS, duration)
+        values = {
+            'requests': 1,
+            f'bucket_{bucket}': 1,
+            'duration_us': int(duration * 1e6),
+            'queries': recorder.queries,
+            'query_us': int(recorder.query_time * 1e6),
+            'cache_hits': recorder.cache_hits,
+            'cache_misses': recorder.cache_misses,
+            'template_us': int(recorder.template_time * 1e6),
+            **recorder.events,
+        }
+        with self.lock:
+            self.views.add(view)
+            for name, value in values.items():
+                if value:
+                    self.pending[view, name] += value
+            due = (
+                time.monotonic() - self.flushed
+                >= settings.METRICS_FLUSH_INTERVAL
+            )
+        if due:
+            self.flush()
+
+    def flush(self):
+        with self.lock:
+            pending, self.pending = self.pending, defaultdict(int)
+            views = set(self.views)
+            self.flushed = time.monotonic()
+        with detached():
+            # Набор имён перечитывается при каждом сбросе: имя,
+            # потерянное в гонке воркеров, вернётся следующим сбросом.
+            known = cache.get(VIEWS_KEY) or set()
+            if not views <= known:
+                cache.set(VIEWS_KEY, known | views, None)
+            for (view, name), value in pending.items():
+                key = metric_key(view, name)
+                try:
+                    cache.incr(key, value)
+                except ValueError:
+                    if not cache.add(key, value, None):
+                        cache.incr(key, value)
+
+    def collect(self):
+        """Текущие значения всех метрик: {view: {name: value}}."""
+        self.flush()
+        names = list(COUNTERS) + ['duration_us'] + bucket_names()
+        with detached():
+            views = sorted(cache.get(VIEWS_KEY) or ())
+            values = cache.get_many([
+                metric_key(view, name) for view in views for name in names
+            ])
+        return {
+            view: {
+                name: values.get(metric_key(view, name), 0)
+                for name in names
+            }
+            for view in views
+        }
+
+
+registry = Registry()
+
+
+def label(view):
+    return '{view="%s"}' % view.replace('\\', '\\\\').replace('"', '\\"')
+
+
+def number(value, scale=1):
+    """Счётчики - целыми без округления, секунды - с точностью до мкс."""
+    if scale == 1:
+        return str(int(value))
+    return f'{value * scale:.6f}'
+
+
+def render_prometheus(metrics):
+    """Текстовый формат экспозиции Prometheus 0.0.4."""
+    lines = []
+    for name, (metric, scale) in COUNTERS.items():
+        lines.append(f'# TYPE {metric} counter')
+        for view, values in metrics.items():
+            lines.append(
+                f'{metric}{label(view)} {number(values[name], scale)}')
+    lines.append(f'# TYPE {HISTOGRAM} histogram')
+    bounds = [f'{bound:g}' for bound in settings.METRICS_BUCKETS] + ['+Inf']
+    for view, values in metrics.items():
+        total = 0
+        for bound, name in zip(bounds, bucket_names()):
+            total += values[name]
+            lines.append(
+                f'{HISTOGRAM}_bucket{label(view)[:-1]},le="{bound}"}} '
+                f'{total}'
+            )
+        lines.append(
+            f'{HISTOGRAM}_sum{label(view)} '
+            f'{number(values["duration_us"], 1e-6)}')
+        lines.append(f'{HISTOGRAM}_count{label(view)} {values["requests"]}')
+    return '\n'.join(lines) + '\n'
+
+
+class CacheMetricsMixin:
+    """Считает попадания и промахи кэша в текущем запросе."""
+
+    def get(self, key, default=None, version=None):
+        value = super().get(key, _missing, version)
+        recorder = current()
+        if recorder is not None:
+            if value is _missing:
+                recorder.cache_misses += 1
+            else:
+                recorder.cache_hits += 1
+        return default if value is _missing else value
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        recorder = current()
+        # Базовый get_many вызывает get, не считаем дважды.
+        with detached():
+            values = super().get_many(keys, version)
+        if recorder is not None:
+            recorder.cache_hits += len(values)
+            recorder.cache_misses += len(keys) - len(values)
+        return values
+
+
+class LocMemCache(CacheMetricsMixin, locmem.LocMemCache):
+    pass
+
+
+class MmapCache(CacheMetricsMixin, mmapcache.MmapCache):
+    pass
+
+
+class Template(django_backend.Template):
+    def render(self, context=None, request=None):
+        recorder = current()
+        if recorder is None:
+            return super().render(context, request)
+        # Вложенные шаблоны (карточки) входят во время страницы.
+        recorder.template_depth += 1
+        started = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            recorder.template_depth -= 1
+            if not recorder.template_depth:
+                recorder.template_time += time.perf_counter() - started
+
+
+class DjangoTemplates(django_backend.DjangoTemplates):
+    """Шаблонный бэкенд Django с замером времени рендеринга."""
+
+    def from_string(self, template_code):
+        return Template(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return Template(self.engine.get_template(template_name), self)
+        except TemplateDoesNotExist as exc:
+            django_backend.reraise(exc, self)
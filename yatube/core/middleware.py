@@ -0,0 +1,33 @@
+from . import metrics
+
+
+class MetricsMiddleware:
+    """Записывает метрики каждого запроса по имени маршрута.
+
+    Стоит первым в MIDDLEWARE, чтобы учитывать запросы к базе
+    из сессий и аутентификации.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        recorder = metrics.Recorder()
+        with metrics.recording(recorder):
+            response = self.get_response(request)
+        match = request.resolver_match
+        view = match.view_name if match else metrics.UNRESOLVED
+        if response.streaming:
+            # Выгрузки читают базу уже после выхода из middleware.
+            response.streaming_content = self.stream(
+                response.streaming_content, view, recorder)
+        else:
+            metrics.registry.add(view, recorder)
+        return response
+
+    def stream(self, content, view, recorder):
+        try:
+            with metrics.recording(recorder):
+                yield from content
+        finally:
+            metrics.registry.add(view, recorder)
@@ -0,0 +1,299 @@
+"""Кэш в файле, отображённом в память всеми воркерами хоста.
+
+В отличие от LocMemCache, воркеры gunicorn видят одни и те же записи:
+страница ленты хранится один раз, а сброс поколения сразу виден всем.
+Внешний сервер не нужен.
+
+Файл поделён на CLASSES областей с разным размером слота: SLOT_SIZE,
+в 4 раза меньше и так далее. Каждая область занимает равную долю
+MAX_SIZE, так что мелкие записи (сессии, счётчики) не занимают слот
+под страницу ленты, а MAX_SIZE ограничивает байты, а не число записей.
+Область разбита на наборы по WAYS слотов; ключ попадает в набор по
+хешу, запись кладётся в наименьший подходящий класс, а внутри набора
+вытесняется давно не читанная запись (LRU в пределах набора). Записи
+больше SLOT_SIZE не кэшируются. Каждая операция идёт под блокировкой
+своего набора: fcntl.lockf между процессами и threading.Lock между
+потоками, поэтому incr и add атомарны.
+"""
+import fcntl
+import hashlib
+import mmap
+import os
+import pickle
+import struct
+import threading
+import time
+from contextlib import contextmanager
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+MAGIC = b'YTCACHE2'
+# Заголовок файла: метка, наборы наибольшего класса, слотов в наборе,
+# наибольший слот, число классов, эпоха.
+HEADER = struct.Struct('<8sIIIIQ')
+HEADER_SIZE = 64
+# Заголовок слота: хеш ключа, эпоха, срок (0 - вечно), последнее
+# обращение, длина данных.
+SLOT = struct.Struct('<16sQddI')
+# Слоты меньше почти целиком уходили бы на заголовок.
+MIN_SLOT_SIZE = 256
+
+_files = {}
+_files_lock = threading.Lock()
+
+
+def slot_sizes(slot_size, classes):
+    """Размеры слотов классов от большего к меньшему."""
+    sizes = [slot_size >> 2 * number for number in range(classes)]
+    return [size for size in sizes if size >= MIN_SLOT_SIZE] or [slot_size]
+
+
+class SharedFile:
+    """Файл кэша; процесс открывает его один раз для всех потоков.
+
+    Блокировки fcntl принадлежат процессу, и закрытие любого
+    дескриптора файла снимает их все, поэтому дескриптор один.
+    """
+
+    def __init__(self, path, sets, ways, slot_size, classes):
+        self.sets = sets
+        self.ways = ways
+        self.slot_size = slot_size
+        self.classes = classes
+        # Области классов: (размер слота, наборов, начало). Байт
+        # у классов поровну: чем меньше слот, тем больше наборов.
+        self.regions = []
+        start = HEADER_SIZE
+        for size in slot_sizes(slot_size, classes):
+            region_sets = sets * (slot_size // size)
+            self.regions.append((size, region_sets, start))
+            start += region_sets * ways * size
+        self.size = start
+        self.lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        with self.locked():
+            # Файл только растёт: уменьшение уронило бы SIGBUS
+            # воркеры, которые ещё держат его отображение.
+            if os.fstat(self.fd).st_size < self.size:
+                os.ftruncate(self.fd, self.size)
+            self.map = mmap.mmap(self.fd, self.size)
+            magic, *geometry, _ = HEADER.unpack_from(self.map)
+            if magic != MAGIC or geometry != [
+                    sets, ways, slot_size, classes]:
+                # Новый файл или другая геометрия. Эпоха по времени
+                # не совпадёт ни с одним слотом, оставшимся в файле.
+                HEADER.pack_into(
+                    self.map, 0, MAGIC, sets, ways, slot_size, classes,
+                    time.time_ns())
+
+    @contextmanager
+    def locked(self, start=0, length=0):
+        """Исключительная блокировка диапазона; 0 - до конца файла."""
+        with self.lock:
+            fcntl.lockf(self.fd, fcntl.LOCK_EX, length, start)
+            try:
+                yield
+            finally:
+                fcntl.lockf(self.fd, fcntl.LOCK_UN, length, start)
+
+    def locked_set(self, digest):
+        """Блокирует набор ключа в наибольшем классе.
+
+        Число наборов любого класса кратно sets, поэтому ключи из одного
+        набора любого класса делят и этот замок.
+        """
+        index = int.from_bytes(digest[:8], 'little') % self.sets
+        length = self.ways * self.slot_size
+        return self.locked(HEADER_SIZE + index * length, length)
+
+    def set_slots(self, digest, region):
+        size, sets, start = region
+        index = int.from_bytes(digest[:8], 'little') % sets
+        first = start + index * self.ways * size
+        return range(first, first + self.ways * size, size)
+
+    @property
+    def epoch(self):
+        return HEADER.unpack_from(self.map)[-1]
+
+    def clear(self):
+        with self.locked():
+            *geometry, epoch = HEADER.unpack_from(self.map)
+            HEADER.pack_into(self.map, 0, *geometry, epoch + 1)
+
+    def scan(self, digest, region, epoch, now):
+        """(слот записи или None, слот для записи) в наборе класса."""
+        victim = victim_used = None
+        for offset in self.set_slots(digest, region):
+            slot_digest, slot_epoch, expires, used, _ = SLOT.unpack_from(
+                self.map, offset)
+            alive = slot_epoch == epoch and (not expires or expires > now)
+            if not alive:
+                # Пустые и просроченные слоты занимаются первыми.
+                used = -1
+            elif slot_digest == digest:
+                return offset, offset
+            if victim is None or used < victim_used:
+                victim, victim_used = offset, used
+        return None, victim
+
+    def lookup(self, digest, length=None):
+        """(слот записи или None, слот для length байт или None).
+
+        Запись ищется во всех классах, место под данные длиной length -
+        в наименьшем классе, где они помещаются. Под блокировкой.
+        """
+        epoch = self.epoch
+        now = time.time()
+        found = target = None
+        for region in reversed(self.regions):
+            slot, victim = self.scan(digest, region, epoch, now)
+            if target is None and length is not None and (
+                    region[0] - SLOT.size >= length):
+                target = victim
+            if slot is not None:
+                found = slot
+            if found is not None and (length is None or target is not None):
+                break
+        return found, target
+
+    def read(self, offset):
+        digest, epoch, expires, _, length = SLOT.unpack_from(
+            self.map, offset)
+        SLOT.pack_into(
+            self.map, offset, digest, epoch, expires, time.time(), length)
+        start = offset + SLOT.size
+        return self.map[start:start + length]
+
+    def expires(self, offset):
+        return SLOT.unpack_from(self.map, offset)[2]
+
+    def write(self, offset, digest, payload, expires):
+        start = offset + SLOT.size
+        self.map[start:start + len(payload)] = payload
+        SLOT.pack_into(
+            self.map, offset, digest, self.epoch, expires, time.time(),
+            len(payload))
+
+    def store(self, digest, payload, expires, only_new=False):
+        """Записывает данные ключа в слот подходящего класса.
+
+        Под блокировкой набора.
+        """
+        found, target = self.lookup(digest, len(payload))
+        if only_new and found is not None:
+            return False
+        if found is not None and found != target:
+            # Запись сменила класс или больше не помещается в слот:
+            # прежнее значение устарело.
+            self.free(found)
+        if target is None:
+            return False
+        self.write(target, digest, payload, expires)
+        return True
+
+    def free(self, offset):
+        SLOT.pack_into(self.map, offset, bytes(16), 0, 0, 0, 0)
+
+
+def get_file(path, sets, ways, slot_size, classes):
+    path = os.path.abspath(path)
+    geometry = (sets, ways, slot_size, classes)
+    with _files_lock:
+        shared = _files.get(path)
+        if shared is None or (
+                shared.sets, shared.ways, shared.slot_size,
+                shared.classes) != geometry:
+            shared = _files[path] = SharedFile(path, *geometry)
+        return shared
+
+
+class MmapCache(BaseCache):
+    """Бэкенд кэша Django поверх SharedFile.
+
+    OPTIONS: MAX_SIZE - размер файла в байтах, SLOT_SIZE - размер
+    наибольшего слота, CLASSES - число классов размера слота,
+    WAYS - слотов в наборе.
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        slot_size = int(options.get('SLOT_SIZE', 64 * 1024))
+        ways = int(options.get('WAYS', 8))
+        max_size = int(options.get('MAX_SIZE', 64 * 1024 * 1024))
+        classes = len(slot_sizes(slot_size, int(options.get('CLASSES', 4))))
+        sets = max(max_size // (classes * ways * slot_size), 1)
+        self._file = get_file(location, sets, ways, slot_size, classes)
+
+    def _digest(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return hashlib.blake2b(key.encode(), digest_size=16).digest()
+
+    def _expires(self, timeout):
+        expires = self.get_backend_timeout(timeout)
+        return 0.0 if expires is None else expires
+
+    def _store(self, key, value, timeout, version, only_new=False):
+        digest = self._digest(key, version)
+        payload = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        with self._file.locked_set(digest):
+            return self._file.store(
+                digest, payload, self._expires(timeout), only_new)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        return self._store(key, value, timeout, version, only_new=True)
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self._store(key, value, timeout, version)
+
+    def get(self, key, default=None, version=None):
+        digest = self._digest(key, version)
+        with self._file.locked_set(digest):
+            found, _ = self._file.lookup(digest)
+            if found is None:
+                return default
+            payload = self._file.read(found)
+        return pickle.loads(payload)
+
+    def has_key(self, key, version=None):
+        digest = self._digest(key, version)
+        with self._file.locked_set(digest):
+            return self._file.lookup(digest)[0] is not None
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        digest = self._digest(key, version)
+        with self._file.locked_set(digest):
+            found, _ = self._file.lookup(digest)
+            if found is None:
+                return False
+            payload = self._file.read(found)
+            self._file.write(found, digest, payload, self._expires(timeout))
+            return True
+
+    def incr(self, key, delta=1, version=None):
+        digest = self._digest(key, version)
+        with self._file.locked_set(digest):
+            found, _ = self._file.lookup(digest)
+            if found is None:
+                raise ValueError("Key '%s' not found" % key)
+            value = pickle.loads(self._file.read(found)) + delta
+            self._file.store(
+                digest, pickle.dumps(value, pickle.HIGHEST_PROTOCOL),
+                self._file.expires(found))
+        return value
+
+    def delete(self, key, version=None):
+        digest = self._digest(key, version)
+        with self._file.locked_set(digest):
+            found, _ = self._file.lookup(digest)
+            if found is not None:
+                self._file.free(found)
+            return found is not None
+
+    def clear(self):
+        self._file.clear()
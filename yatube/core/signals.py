@@ -0,0 +1,22 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+
+@receiver(connection_created)
+def set_sqlite_pragmas(sender, connection, **kwargs):
+    """Настраивает каждое новое соединение SQLite по SQLITE_PRAGMAS."""
+    if connection.vendor != 'sqlite':
+        return
+    for name, value in settings.SQLITE_PRAGMAS.items():
+        connection.connection.execute(f'PRAGMA {name} = {value}')
+
+
+def clear_cache(sender, **kwargs):
+    """Сбрасывает кэш после migrate и flush.
+
+    Общий кэш в файле переживает перезапуск процессов, а его записи
+    относятся к базе, которую только что пересоздали или изменили.
+    """
+    cache.clear()
@@ -0,0 +1,20 @@
+from django import template
+from django.utils.safestring import mark_safe
+
+from ..fragments import defer, render_fragment
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def per_user(context, template_name, **extra):
+    """Включает шаблон, который зависит от пользователя.
+
+    Фрагмент видит только extra и контекстные процессоры, чтобы
+    в общей странице и без неё он рисовался одинаково.
+    """
+    request = context.get('request')
+    deferred = defer(request, template_name, extra)
+    if deferred is not None:
+        return mark_safe(deferred)
+    return render_fragment(request, template_name, extra)
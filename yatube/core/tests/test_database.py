@@ -0,0 +1,21 @@
+from django.conf import settings
+from django.db import connection
+from django.test import SimpleTestCase
+
+
+class SqlitePragmasTest(SimpleTestCase):
+    databases = {'default'}
+
+    def get_pragma(self, name):
+        with connection.cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    def test_pragmas(self):
+        """Соединение получает PRAGMA из SQLITE_PRAGMAS."""
+        pragmas = settings.SQLITE_PRAGMAS
+        self.assertEqual(
+            self.get_pragma('busy_timeout'), pragmas['busy_timeout'])
+        self.assertEqual(self.get_pragma('cache_size'), pragmas['cache_size'])
+        # synchronous: 0 - off, 1 - normal, 2 - full.
+        self.assertEqual(self.get_pragma('synchronous'), 1)
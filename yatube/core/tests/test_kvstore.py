@@ -0,0 +1,39 @@
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from sorl.thumbnail.models import KVStore as KVStoreModel
+
+from ..kvstore import KVStore
+
+
+class KVStoreTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.kvstore = KVStore()
+
+    def test_lru_hit_without_queries(self):
+        """Повторное чтение метаданных не ходит ни в кэш, ни в базу."""
+        self.kvstore._set_raw('sorl-thumbnail||image||key', 'value')
+        cache.clear()
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                self.kvstore._get_raw('sorl-thumbnail||image||key'), 'value')
+
+    @override_settings(THUMBNAIL_KVSTORE_LRU_SIZE=1)
+    def test_lru_is_bounded(self):
+        """LRU хранит не больше THUMBNAIL_KVSTORE_LRU_SIZE записей."""
+        self.kvstore._set_raw('sorl-thumbnail||image||first', 'first')
+        self.kvstore._set_raw('sorl-thumbnail||image||second', 'second')
+        self.assertEqual(
+            list(self.kvstore._lru), ['sorl-thumbnail||image||second'])
+        self.assertEqual(
+            self.kvstore._get_raw('sorl-thumbnail||image||first'), 'first')
+
+    def test_warm_up_command(self):
+        """Команда прогрева переносит метаданные из базы в общий кэш."""
+        KVStoreModel.objects.create(
+            key='sorl-thumbnail||image||key', value='value')
+        call_command('warm_thumbnail_kvstore', stdout=StringIO())
+        self.assertEqual(cache.get('sorl-thumbnail||image||key'), 'value')
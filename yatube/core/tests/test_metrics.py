@@ -0,0 +1,81 @@
+from http import HTTPStatus
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..metrics import (
+    COUNTERS, bucket_names, registry, render_prometheus,
+)
+
+User = get_user_model()
+
+
+class MetricsTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='reader')
+        cls.staff = User.objects.create_user(username='admin', is_staff=True)
+
+    def setUp(self):
+        cache.clear()
+        registry.collect()
+        cache.clear()
+        self.staff_client = Client()
+        self.staff_client.force_login(self.staff)
+
+    def get_metrics(self):
+        response = self.staff_client.get(reverse('core:metrics'))
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        return response.content.decode()
+
+    def test_staff_only(self):
+        """Метрики видны только персоналу."""
+        client = Client()
+        self.assertEqual(
+            client.get(reverse('core:metrics')).status_code,
+            HTTPStatus.FORBIDDEN,
+        )
+        client.force_login(self.user)
+        self.assertEqual(
+            client.get(reverse('core:metrics')).status_code,
+            HTTPStatus.FORBIDDEN,
+        )
+
+    def test_request_metrics(self):
+        """Запрос попадает в счётчики своего маршрута."""
+        Client().get(reverse('posts:index'))
+        Client().get(reverse('posts:index'))
+        content = self.get_metrics()
+        view = '{view="posts:index"}'
+        self.assertIn(f'yatube_requests_total{view} 2', content)
+        self.assertIn(
+            'yatube_request_duration_seconds_bucket'
+            '{view="posts:index",le="+Inf"} 2',
+            content,
+        )
+        self.assertIn(
+            f'yatube_request_duration_seconds_count{view} 2', content)
+        # Первый запрос строит страницу, второй берёт её из кэша.
+        self.assertIn(f'yatube_cache_hits_total{view}', content)
+        self.assertIn(f'yatube_cache_misses_total{view}', content)
+        self.assertNotIn(f'yatube_db_queries_total{view} 0\n', content)
+        self.assertNotIn(
+            f'yatube_template_render_seconds_total{view} 0.000000\n',
+            content)
+
+    def test_large_values_keep_precision(self):
+        """Большие счётчики и суммы выводятся без округления."""
+        values = dict.fromkeys(COUNTERS, 0)
+        values.update(dict.fromkeys(bucket_names(), 0))
+        values.update(
+            requests=123456789, query_us=98765432101, duration_us=1234567891)
+        content = render_prometheus({'posts:index': values})
+        view = '{view="posts:index"}'
+        self.assertIn(f'yatube_requests_total{view} 123456789\n', content)
+        self.assertIn(
+            f'yatube_db_query_seconds_total{view} 98765.432101\n', content)
+        self.assertIn(
+            f'yatube_request_duration_seconds_sum{view} 1234.567891\n',
+            content)
@@ -0,0 +1,126 @@
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+
+from django.test import SimpleTestCase
+
+from ..mmapcache import SLOT, MmapCache
+
+SLOT_SIZE = 1024
+
+
+def make_cache(path, ways=4, sets=2, classes=1):
+    return MmapCache(path, {'OPTIONS': {
+        'SLOT_SIZE': SLOT_SIZE,
+        'CLASSES': classes,
+        'WAYS': ways,
+        'MAX_SIZE': SLOT_SIZE * ways * sets * classes,
+    }})
+
+
+def increment(path, times):
+    cache = make_cache(path)
+    for _ in range(times):
+        cache.incr('counter')
+
+
+class MmapCacheTest(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'test.cache')
+        self.cache = make_cache(self.path)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_operations(self):
+        """Бэкенд поддерживает операции кэша Django."""
+        self.cache.set('key', {'value': 1})
+        self.assertEqual(self.cache.get('key'), {'value': 1})
+        self.assertFalse(self.cache.add('key', 'other'))
+        self.assertTrue(self.cache.add('new', 'value'))
+        self.assertEqual(self.cache.get_many(['key', 'new', 'missing']), {
+            'key': {'value': 1}, 'new': 'value'})
+        self.cache.set('counter', 1)
+        self.assertEqual(self.cache.incr('counter', 5), 6)
+        self.assertEqual(self.cache.decr('counter'), 5)
+        with self.assertRaises(ValueError):
+            self.cache.incr('missing')
+        self.cache.delete('key')
+        self.assertIsNone(self.cache.get('key'))
+        self.cache.clear()
+        self.assertIsNone(self.cache.get('new'))
+
+    def test_expiry(self):
+        """Просроченная запись не читается, touch продлевает срок."""
+        self.cache.set('short', 'value', 0.1)
+        self.cache.set('touched', 'value', 0.1)
+        self.assertTrue(self.cache.touch('touched', None))
+        time.sleep(0.15)
+        self.assertIsNone(self.cache.get('short'))
+        self.assertEqual(self.cache.get('touched'), 'value')
+
+    def test_shared_between_instances(self):
+        """Запись видна другому экземпляру с тем же файлом."""
+        self.cache.set('key', 'value')
+        self.assertEqual(make_cache(self.path).get('key'), 'value')
+
+    def test_lru_eviction(self):
+        """В полном наборе вытесняется давно не читанная запись."""
+        cache = make_cache(self.path, ways=2, sets=1)
+        cache.set('first', 1)
+        cache.set('second', 2)
+        cache.get('first')
+        cache.set('third', 3)
+        self.assertEqual(cache.get_many(['first', 'second', 'third']), {
+            'first': 1, 'third': 3})
+
+    def test_size_cap(self):
+        """Файл не растёт, а значение больше слота не кэшируется."""
+        self.cache.set('key', 'small')
+        self.cache.set('key', b'x' * (SLOT_SIZE - SLOT.size + 1))
+        self.assertIsNone(self.cache.get('key'))
+        for number in range(100):
+            self.cache.set(f'key-{number}', number)
+        self.assertLessEqual(
+            os.path.getsize(self.path), 64 + SLOT_SIZE * 4 * 2)
+
+    def test_size_classes(self):
+        """Мелкие записи не вытесняют крупные и не растят файл."""
+        # Классы 1024 и 256 байт, по 2 слота на набор. Свой файл:
+        # файл из setUp больше, а уменьшаться файлы не умеют.
+        path = os.path.join(self.directory, 'classes.cache')
+        cache = make_cache(path, ways=2, sets=1, classes=2)
+        big = b'x' * (SLOT_SIZE // 2)
+        cache.set('big-1', big)
+        cache.set('big-2', big)
+        for number in range(100):
+            cache.set(f'small-{number}', number)
+        self.assertEqual(
+            cache.get_many(['big-1', 'big-2']), {'big-1': big, 'big-2': big})
+        self.assertGreater(
+            len(cache.get_many([f'small-{n}' for n in range(100)])), 2)
+        # Запись переезжает между классами без устаревших копий.
+        cache.set('big-1', 'small')
+        self.assertEqual(cache.get('big-1'), 'small')
+        cache.set('big-1', big)
+        self.assertEqual(cache.get('big-1'), big)
+        cache.delete('big-1')
+        self.assertIsNone(cache.get('big-1'))
+        self.assertLessEqual(os.path.getsize(path), 64 + SLOT_SIZE * 2 * 2)
+
+    def test_incr_is_atomic_across_processes(self):
+        """incr из нескольких процессов не теряет приращений."""
+        self.cache.set('counter', 0)
+        context = multiprocessing.get_context('fork')
+        processes = [
+            context.Process(target=increment, args=(self.path, 200))
+            for _ in range(4)
+        ]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+        self.assertEqual(self.cache.get('counter'), 800)
@@ -0,0 +1,204 @@
+import hashlib
+import time
+from functools import partial, wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils import timezone
+from django.utils.cache import patch_cache_control
+from django.utils.http import http_date, quote_etag
+
+from core import fragments, metrics
+
+GENERATION_KEY = 'posts:feed_generation'
+MODIFIED_KEY = 'posts:content_modified'
+
+
+def get_generation():
+    """Текущее поколение контента лент."""
+    generation = cache.get(GENERATION_KEY)
+    if generation is None:
+        # Начинаем с отметки времени: если счётчик вытеснят из кэша,
+        # новое поколение не совпадёт ни с одним из старых.
+        cache.add(GENERATION_KEY, int(time.time() * 1000), None)
+        generation = cache.get(GENERATION_KEY)
+    return generation
+
+
+def get_last_modified():
+    """Время последнего изменения контента для Last-Modified."""
+    modified = cache.get(MODIFIED_KEY)
+    if modified is None:
+        # Отметка потерялась: считаем, что контент изменился сейчас.
+        cache.add(MODIFIED_KEY, timezone.now(), None)
+        modified = cache.get(MODIFIED_KEY)
+    return modified
+
+
+def bump_generation():
+    """Делает недействительными все закэшированные страницы лент."""
+    cache.set(MODIFIED_KEY, timezone.now(), None)
+    try:
+        cache.incr(GENERATION_KEY)
+    except ValueError:
+        get_generation()
+
+
+def make_etag(request, *parts, generation=None):
+    """ETag по поколению контента и адресу запроса, без обращения к базе.
+
+    parts добавляют то, от чего ответ зависит помимо контента,
+    например пользователя. generation - поколение, по которому
+    построен ответ, если оно не текущее.
+    """
+    if generation is None:
+        generation = get_generation()
+    raw = '|'.join(
+        str(part) for part in (
+            generation, request.get_full_path(), *parts)
+    )
+    return hashlib.md5(raw.encode()).hexdigest()
+
+
+def feed_cache_key(key_prefix, request):
+    url = hashlib.md5(request.build_absolute_uri().encode()).hexdigest()
+    return f'feed:{key_prefix}:{url}'
+
+
+def is_fresh(entry, generation):
+    return (
+        entry is not None
+        and entry['generation'] == generation
+        and entry['expires'] > time.time()
+    )
+
+
+def wait_for_entry(cache_key, generation):
+    """Ждёт, пока другой запрос положит в кэш свежую страницу."""
+    deadline = time.monotonic() + settings.FEED_CACHE_LOCK_WAIT
+    while time.monotonic() < deadline:
+        time.sleep(0.05)
+        entry = cache.get(cache_key)
+        if is_fresh(entry, generation):
+            return entry
+    return None
+
+
+def render_shared(view_func, request, *args, **kwargs):
+    """Рендерит страницу без фрагментов per_user."""
+    fragments.start_shared_render(request)
+    try:
+        response = view_func(request, *args, **kwargs)
+        if callable(getattr(response, 'render', None)):
+            response.render()
+    finally:
+        deferred = fragments.finish_shared_render(request)
+    return response, deferred
+
+
+def render_page(view_func, request, *args, **kwargs):
+    """Возвращает (ответ, запись для кэша или None)."""
+    response, deferred = render_shared(view_func, request, *args, **kwargs)
+    if response.status_code != 200 or response.cookies:
+        response.content = fragments.stitch(
+            request, response.content, deferred)
+        return response, None
+    return response, {
+        'content': response.content,
+        'fragments': deferred,
+        'content_type': response['Content-Type'],
+    }
+
+
+def store_entry(cache_key, entry, generation, modified, timeout):
+    entry['generation'] = generation
+    entry['modified'] = modified
+    entry['expires'] = time.time() + timeout
+    # Запись живёт дольше срока свежести, чтобы её можно было отдать
+    # во время пересчёта.
+    cache.set(
+        cache_key, entry, timeout + settings.FEED_CACHE_STALE_TIMEOUT)
+
+
+def get_entry(cache_key, timeout, render):
+    """Возвращает (ответ, запись); ответ - только если запись не вышла."""
+    lock_key = f'{cache_key}:lock'
+    generation = get_generation()
+    modified = get_last_modified()
+    entry = cache.get(cache_key)
+    if is_fresh(entry, generation):
+        metrics.record_event('feed_hits')
+    elif cache.add(lock_key, 1, settings.FEED_CACHE_LOCK_TIMEOUT):
+        metrics.record_event('feed_misses')
+        try:
+            response, entry = render()
+            if entry is None:
+                return response, None
+            store_entry(cache_key, entry, generation, modified, timeout)
+        finally:
+            cache.delete(lock_key)
+    else:
+        entry = entry or wait_for_entry(cache_key, generation)
+        if entry is None:
+            # Не дождались чужого пересчёта: рендерим сами,
+            # но в кэш не пишем.
+            metrics.record_event('feed_misses')
+            return render()
+        if not is_fresh(entry, generation):
+            metrics.record_event('feed_stale')
+            entry['stale'] = True
+    return None, entry
+
+
+def mark_stale(request, response, entry):
+    """Валидаторы старой версии страницы вместо текущих.
+
+    Иначе condition выдал бы ETag нового поколения, и клиент получал
+    бы 304 на старую страницу до следующего изменения контента.
+    """
+    response['ETag'] = quote_etag(make_etag(
+        request, 'stale', generation=entry['generation']))
+    modified = entry.get('modified')
+    if modified is not None:
+        response['Last-Modified'] = http_date(modified.timestamp())
+    patch_cache_control(response, no_cache=True)
+
+
+def cache_feed(key_prefix, timeout=None):
+    """Кэширует страницу ленты до смены поколения контента.
+
+    Работает как cache_page, но запись помнит номер поколения,
+    поэтому страница живёт долго и устаревает сразу после
+    изменения постов, групп или авторов. Страница общая для всех
+    пользователей: шапка и другие фрагменты тега per_user
+    дорисовываются для каждого запроса.
+
+    Устаревшую страницу пересчитывает один запрос, взявший
+    блокировку через cache.add; остальные тем временем получают
+    старую версию. Без старой версии они ждут пересчёта не дольше
+    FEED_CACHE_LOCK_WAIT секунд.
+    """
+    if timeout is None:
+        timeout = settings.FEED_CACHE_TIMEOUT
+
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view_func(request, *args, **kwargs)
+            cache_key = feed_cache_key(key_prefix, request)
+            render = partial(render_page, view_func, request, *args, **kwargs)
+            response, entry = get_entry(cache_key, timeout, render)
+            if entry is None:
+                return response
+            response = HttpResponse(
+                fragments.stitch(
+                    request, entry['content'], entry['fragments']),
+                content_type=entry['content_type'],
+            )
+            if entry.get('stale'):
+                mark_stale(request, response, entry)
+            return response
+        return wrapper
+    return decorator
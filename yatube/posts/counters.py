@@ -0,0 +1,129 @@
+from django.apps import apps as global_apps
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DatabaseError, connection, transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+
+TOTAL_KEY = 'posts:total'
+
+
+def change(model, delta, field, **lookup):
+    """Атомарно сдвигает счётчик на delta одним UPDATE."""
+    model.objects.filter(**lookup).update(
+        **{field: Greatest(F(field) + delta, 0)}
+    )
+
+
+def count_subquery(model, field, outer='pk'):
+    """Подзапрос COUNT(*) по внешнему ключу field для массового UPDATE."""
+    counts = model.objects.filter(
+        **{field: OuterRef(outer)}
+    ).order_by().values(field).annotate(total=Count('pk')).values('total')
+    return Coalesce(
+        Subquery(counts, output_field=IntegerField()), 0
+    )
+
+
+def recount_all(apps=global_apps):
+    """Пересчитывает все счётчики массовыми UPDATE.
+
+    Принимает реестр приложений, чтобы работать и из миграции.
+    """
+    User = apps.get_model(settings.AUTH_USER_MODEL)
+    Group = apps.get_model('posts', 'Group')
+    Post = apps.get_model('posts', 'Post')
+    Comment = apps.get_model('posts', 'Comment')
+    Follow = apps.get_model('posts', 'Follow')
+    UserStats = apps.get_model('posts', 'UserStats')
+
+    with transaction.atomic():
+        missing = User.objects.filter(stats__isnull=True)
+        UserStats.objects.bulk_create(
+            [UserStats(user_id=pk) for pk in missing.values_list(
+                'pk', flat=True)],
+            ignore_conflicts=True,
+        )
+        Group.objects.update(posts_count=count_subquery(Post, 'group'))
+        Post.objects.update(comments_count=count_subquery(Comment, 'post'))
+        UserStats.objects.update(
+            posts_count=count_subquery(Post, 'author', 'user_id'),
+            followers_count=count_subquery(Follow, 'author', 'user_id'),
+            following_count=count_subquery(Follow, 'user', 'user_id'),
+        )
+    cache.delete(TOTAL_KEY)
+
+
+def refresh_estimate(cursor, table):
+    """Обновляет sqlite_stat1 выборочным ANALYZE одной таблицы.
+
+    Сама SQLite статистику не обновляет, а устаревшая оценка
+    занижала бы число постов. С analysis_limit ANALYZE читает
+    лишь столько строк каждого индекса и почти ничего не стоит.
+    """
+    cursor.execute(
+        'PRAGMA analysis_limit = %d' % settings.ROW_ESTIMATE_ANALYSIS_LIMIT)
+    try:
+        cursor.execute(f'ANALYZE {connection.ops.quote_name(table)}')
+    finally:
+        cursor.execute('PRAGMA analysis_limit = 0')
+
+
+def estimate_rows(model, refresh=False):
+    """Оценка числа строк таблицы из статистики планировщика.
+
+    None, если статистики нет. refresh обновляет статистику SQLite;
+    PostgreSQL обновляет reltuples сам (autovacuum).
+    """
+    table = model._meta.db_table
+    if connection.vendor == 'sqlite':
+        sql = 'SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1'
+    elif connection.vendor == 'postgresql':
+        sql = 'SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass'
+    else:
+        return None
+    try:
+        with connection.cursor() as cursor:
+            if refresh and connection.vendor == 'sqlite':
+                refresh_estimate(cursor, table)
+            cursor.execute(sql, [table])
+            row = cursor.fetchone()
+    except DatabaseError:
+        return None
+    if row is None:
+        return None
+    # В sqlite_stat1 первое число - строки таблицы, дальше - по индексу.
+    rows = int(str(row[0]).split()[0])
+    return rows if rows >= 0 else None
+
+
+def total_posts():
+    """Число всех постов для пагинатора главной без COUNT(*) на запрос.
+
+    Берётся из кэша; при промахе - из статистики планировщика,
+    обновлённой перед чтением, а если она показывает меньше
+    EXACT_COUNT_THRESHOLD строк - точным COUNT(*). Сигналы создания
+    и удаления поста сдвигают закэшированное значение. Оценка может
+    ошибаться в обе стороны, поэтому пагинатор не верит ей, есть ли
+    следующая страница.
+    """
+    Post = global_apps.get_model('posts', 'Post')
+    total = cache.get(TOTAL_KEY)
+    if total is None:
+        total = estimate_rows(Post)
+        if total is not None and total >= settings.EXACT_COUNT_THRESHOLD:
+            # Таблица большая: оценке верим, только обновив статистику.
+            total = estimate_rows(Post, refresh=True)
+        if total is None or total < settings.EXACT_COUNT_THRESHOLD:
+            total = Post.objects.count()
+        cache.add(TOTAL_KEY, total, settings.POST_TOTAL_TIMEOUT)
+    return total
+
+
+def change_total(delta):
+    try:
+        cache.incr(TOTAL_KEY, delta)
+    except ValueError:
+        # Значения нет в кэше: его посчитают при следующем запросе.
+        pass
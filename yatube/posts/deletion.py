@@ -0,0 +1,135 @@
+"""Удаление пользователя и его контента пачками.
+
+user.delete() каскадом грузит в память все посты, комментарии,
+подписки и записи лент и удаляет их в одной транзакции, на всё это
+время блокируя SQLite. Здесь каждая пачка идёт своей транзакцией,
+а сигналы (счётчики, поиск, ленты) срабатывают как при обычном
+удалении.
+"""
+import logging
+import threading
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connections, transaction
+from django.db.models import Q
+from sorl.thumbnail import delete as delete_thumbnails
+
+from .models import Comment, Follow, Post, Timeline
+
+logger = logging.getLogger(__name__)
+
+User = get_user_model()
+
+
+def progress_key(user_id):
+    return f'deletion:{user_id}'
+
+
+def get_progress(user_id):
+    """Ход фонового удаления: {stage, done, total} или None."""
+    return cache.get(progress_key(user_id))
+
+
+def get_stages(user):
+    """Этапы в порядке удаления: зависимые записи раньше постов.
+
+    Ленты чистятся первыми, иначе удаление каждой подписки
+    на пользователя убирало бы его посты из ленты одним запросом.
+    """
+    return [
+        ('timeline', Timeline.objects.filter(
+            Q(user=user) | Q(post__author=user))),
+        ('follows', Follow.objects.filter(Q(user=user) | Q(author=user))),
+        ('comments', Comment.objects.filter(
+            Q(author=user) | Q(post__author=user))),
+        ('posts', Post.objects.filter(author=user)),
+    ]
+
+
+def delete_files(names):
+    """Удаляет картинки, на которые больше не ссылается ни один пост."""
+    used = set(Post.objects.filter(
+        Q(image__in=names) | Q(thumbnail__in=names)
+    ).values_list('image', 'thumbnail').iterator())
+    used = {name for pair in used for name in pair}
+    for name in set(names) - used - {''}:
+        # Вместе с исходником удаляются и миниатюры sorl-thumbnail.
+        delete_thumbnails(name)
+
+
+def delete_batch(model, pks):
+    names = []
+    if model is Post:
+        for image, thumbnail in Post.objects.filter(pk__in=pks).values_list(
+                'image', 'thumbnail'):
+            names += [image, thumbnail]
+    with transaction.atomic():
+        model.objects.filter(pk__in=pks).delete()
+        if names:
+            transaction.on_commit(lambda: delete_files(names))
+
+
+def delete_user(user, batch_size=None, progress=None):
+    """Удаляет ленты, подписки, комментарии, посты и пользователя.
+
+    progress(stage, done, total) вызывается после каждой пачки.
+    Прерванное удаление можно запустить снова: оно продолжится
+    с того, что осталось.
+    """
+    batch_size = batch_size or settings.USER_DELETION_BATCH_SIZE
+    for stage, queryset in get_stages(user):
+        total = queryset.count()
+        done = 0
+        while True:
+            pks = list(queryset.order_by('pk').values_list(
+                'pk', flat=True)[:batch_size])
+            if not pks:
+                break
+            delete_batch(queryset.model, pks)
+            done += len(pks)
+            if progress is not None:
+                progress(stage, done, total)
+    # Остались только мелкие связи: статистика, журнал админки.
+    user.delete()
+    if progress is not None:
+        progress('user', 1, 1)
+
+
+def run_deletion(user_ids, batch_size=None):
+    for user in User.objects.filter(pk__in=user_ids):
+        # После delete() у объекта пользователя pk становится None.
+        key = progress_key(user.pk)
+
+        def progress(stage, done, total, key=key):
+            cache.set(
+                key, {'stage': stage, 'done': done, 'total': total}, None)
+
+        try:
+            delete_user(user, batch_size, progress)
+        except Exception:
+            logger.exception('Не удалось удалить пользователя %s', user)
+            progress('failed', 0, 0)
+        else:
+            cache.delete(key)
+
+
+def schedule(user_ids, batch_size=None):
+    """Запускает удаление пользователей в фоновом потоке."""
+    user_ids = list(user_ids)
+    for user_id in user_ids:
+        cache.set(progress_key(user_id), {
+            'stage': 'queued', 'done': 0, 'total': 0,
+        }, None)
+    if not settings.USER_DELETION_IN_BACKGROUND:
+        run_deletion(user_ids, batch_size)
+        return
+
+    def job():
+        try:
+            run_deletion(user_ids, batch_size)
+        finally:
+            connections.close_all()
+
+    threading.Thread(target=job, daemon=True).start()
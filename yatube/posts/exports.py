@@ -0,0 +1,82 @@
+import csv
+import json
+import zlib
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .models import Comment, Post
+
+FIELDS = {
+    'posts': ('id', 'text', 'pub_date', 'author_id', 'group_id', 'image'),
+    'comments': ('id', 'post_id', 'author_id', 'text', 'created'),
+}
+CONTENT_TYPES = {
+    'jsonl': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+
+class Echo:
+    """Псевдофайл для csv.writer: возвращает строку вместо записи."""
+
+    def write(self, value):
+        return value
+
+
+def get_queryset(kind, **lookup):
+    """Посты или комментарии автора/группы в порядке id.
+
+    lookup - author=... или group=...
+    """
+    if kind == 'posts':
+        return Post.objects.filter(**lookup).order_by('pk')
+    if 'group' in lookup:
+        lookup = {'post__group': lookup['group']}
+    return Comment.objects.filter(**lookup).order_by('pk')
+
+
+def iter_rows(queryset, fields):
+    # iterator() читает выборку пачками и не кэширует её в QuerySet.
+    return queryset.values_list(*fields).iterator(
+        chunk_size=settings.EXPORT_CHUNK_SIZE
+    )
+
+
+def encode_jsonl(rows, fields):
+    for row in rows:
+        yield json.dumps(
+            dict(zip(fields, row)), ensure_ascii=False, cls=DjangoJSONEncoder
+        ) + '\n'
+
+
+def encode_csv(rows, fields):
+    writer = csv.writer(Echo())
+    yield writer.writerow(fields)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+ENCODERS = {
+    'jsonl': encode_jsonl,
+    'csv': encode_csv,
+}
+
+
+def gzip_stream(chunks):
+    """Сжимает поток строк в gzip на лету."""
+    compressor = zlib.compressobj(wbits=zlib.MAX_WBITS | 16)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode())
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def stream_export(queryset, kind, file_format, compress=False):
+    """Генератор выгрузки: память не зависит от размера архива."""
+    fields = FIELDS[kind]
+    chunks = ENCODERS[file_format](iter_rows(queryset, fields), fields)
+    if compress:
+        return gzip_stream(chunks)
+    return (chunk.encode() for chunk in chunks)
@@ -0,0 +1,61 @@
+from contextlib import contextmanager
+
+from django.core.management.color import no_style
+from django.db import connection
+
+from . import timeline
+from .caching import bump_generation
+from .counters import recount_all
+from .models import Comment, Follow, Group, Post
+from .search import backend
+
+
+@contextmanager
+def supplied_timestamps(model):
+    """Отключает auto_now_add, чтобы сохранить заданные даты."""
+    fields = [
+        field for field in model._meta.concrete_fields
+        if getattr(field, 'auto_now_add', False)
+    ]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield fields
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+def reset_sequences(model):
+    """Сдвигает последовательность id за максимальный загруженный.
+
+    Строки с явными id не двигают её, и в PostgreSQL следующая
+    вставка упала бы на повторе ключа. SQLite в этом не нуждается.
+    """
+    statements = connection.ops.sequence_reset_sql(no_style(), [model])
+    with connection.cursor() as cursor:
+        for sql in statements:
+            cursor.execute(sql)
+
+
+def rebuild_derived_data(models=None):
+    """Пересобирает то, что обычно поддерживают сигналы.
+
+    Вызывается после массовой загрузки через bulk_create. models -
+    загруженные модели, по ним выбирается, что пересобирать: счётчики,
+    поисковый индекс, ленты подписок, статистику планировщика.
+    None - всё. Поколение кэша лент сдвигается всегда.
+    """
+    models = set(models or (Group, Post, Comment, Follow))
+    if models & {Post, Comment, Follow}:
+        recount_all()
+    if Post in models:
+        backend.rebuild()
+    if models & {Post, Follow}:
+        timeline.rebuild()
+    # По статистике оценивается число постов, см. counters.total_posts.
+    with connection.cursor() as cursor:
+        for model in models:
+            cursor.execute(
+                f'ANALYZE {connection.ops.quote_name(model._meta.db_table)}')
+    bump_generation()
@@ -0,0 +1,38 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.deletion import delete_user
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        'Удаляет пользователей вместе с подписками, комментариями, '
+        'постами и картинками пачками в отдельных транзакциях.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('usernames', nargs='+')
+        parser.add_argument(
+            '--batch-size', type=int,
+            help='Записей в одной транзакции; по умолчанию - '
+                 'USER_DELETION_BATCH_SIZE.',
+        )
+
+    def handle(self, *args, **options):
+        if options['batch_size'] is not None and options['batch_size'] < 1:
+            raise CommandError('--batch-size должно быть больше нуля')
+        users = list(User.objects.filter(username__in=options['usernames']))
+        unknown = set(options['usernames']) - {
+            user.username for user in users}
+        if unknown:
+            raise CommandError(
+                f'Нет пользователей: {", ".join(sorted(unknown))}')
+        for user in users:
+            username = user.username
+            delete_user(user, options['batch_size'], self.report)
+            self.stdout.write(self.style.SUCCESS(f'{username} удалён'))
+
+    def report(self, stage, done, total):
+        self.stdout.write(f'{stage}: {done}/{total}')
@@ -0,0 +1,44 @@
+import sys
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import exports
+from posts.models import Group
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Потоково выгружает посты или комментарии автора или группы.'
+
+    def add_arguments(self, parser):
+        owner = parser.add_mutually_exclusive_group(required=True)
+        owner.add_argument('--user', help='Имя пользователя.')
+        owner.add_argument('--group', help='Слаг группы.')
+        parser.add_argument(
+            '--kind', choices=sorted(exports.FIELDS), default='posts')
+        parser.add_argument(
+            '--format', choices=sorted(exports.ENCODERS), default='jsonl')
+        parser.add_argument(
+            '--gzip', action='store_true', help='Сжимать выгрузку.')
+        parser.add_argument(
+            '--output', help='Файл для выгрузки; по умолчанию stdout.')
+
+    def handle(self, *args, **options):
+        try:
+            if options['user']:
+                lookup = {'author': User.objects.get(
+                    username=options['user'])}
+            else:
+                lookup = {'group': Group.objects.get(slug=options['group'])}
+        except (User.DoesNotExist, Group.DoesNotExist):
+            raise CommandError('Автор или группа не найдены')
+        queryset = exports.get_queryset(options['kind'], **lookup)
+        chunks = exports.stream_export(
+            queryset, options['kind'], options['format'], options['gzip'])
+        if options['output']:
+            with open(options['output'], 'wb') as target:
+                target.writelines(chunks)
+        else:
+            sys.stdout.buffer.writelines(chunks)
@@ -0,0 +1,53 @@
+import os
+
+from django.core.management.base import BaseCommand
+
+from posts.models import Post
+from posts.thumbnails import make_executor, render_thumbnail, save_thumbnail
+
+
+class Command(BaseCommand):
+    help = 'Строит миниатюры карточек для постов с картинками.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=os.cpu_count(),
+            help='Число процессов для ресайза.',
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=500,
+            help='Сколько постов читать из базы за раз.',
+        )
+        parser.add_argument(
+            '--all', action='store_true',
+            help='Перестроить и уже готовые миниатюры.',
+        )
+
+    def handle(self, *args, **options):
+        posts = Post.objects.exclude(image='').order_by('pk')
+        if not options['all']:
+            posts = posts.filter(thumbnail='')
+        chunk_size = options['chunk_size']
+        done = failed = 0
+        last_pk = 0
+        with make_executor(options['workers']) as executor:
+            while True:
+                chunk = list(posts.filter(pk__gt=last_pk).values_list(
+                    'pk', 'image')[:chunk_size])
+                if not chunk:
+                    break
+                last_pk = chunk[-1][0]
+                names = executor.map(
+                    render_thumbnail,
+                    [image for _, image in chunk],
+                    chunksize=max(1, len(chunk) // options['workers']),
+                )
+                for (pk, image), name in zip(chunk, names):
+                    if name and save_thumbnail(pk, image, name):
+                        done += 1
+                    else:
+                        failed += 1
+                self.stdout.write(f'Готово: {done}, ошибок: {failed}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Миниатюры построены: {done}, ошибок: {failed}'
+        ))
@@ -0,0 +1,208 @@
+import csv
+import json
+import time
+from itertools import islice
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from posts.maintenance import (
+    rebuild_derived_data, reset_sequences, supplied_timestamps,
+)
+from posts.models import Comment, Follow, Group, Post
+
+MODELS = {
+    'group': Group,
+    'post': Post,
+    'comment': Comment,
+    'follow': Follow,
+}
+
+
+def read_rows(path, file_format):
+    """Построчно читает JSONL или CSV, не загружая файл целиком."""
+    with open(path, encoding='utf-8', newline='') as source:
+        if file_format == 'csv':
+            yield from csv.DictReader(source)
+            return
+        for number, line in enumerate(source, start=1):
+            if not line.strip():
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError as error:
+                raise CommandError(f'строка {number}: {error}')
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+class Command(BaseCommand):
+    help = (
+        'Потоково загружает группы, посты, комментарии или подписки '
+        'из JSONL/CSV через bulk_create.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('model', choices=sorted(MODELS))
+        parser.add_argument('path')
+        parser.add_argument(
+            '--format', choices=('jsonl', 'csv'),
+            help='Формат файла; по умолчанию - по расширению.',
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=10000,
+            help='Сколько строк проверять и сохранять в одной транзакции.',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Размер пачки для bulk_create.',
+        )
+        parser.add_argument(
+            '--strict', action='store_true',
+            help='Остановиться на первой ошибочной строке.',
+        )
+
+    def handle(self, *args, **options):
+        model = MODELS[options['model']]
+        path = options['path']
+        file_format = options['format'] or (
+            'csv' if path.endswith('.csv') else 'jsonl')
+        self.fields = {
+            field.attname: field for field in model._meta.concrete_fields
+        }
+        self.foreign_keys = [
+            field for field in self.fields.values() if field.is_relation
+        ]
+        self.strict = options['strict']
+
+        imported = skipped = 0
+        started = time.monotonic()
+        try:
+            with supplied_timestamps(model) as timestamp_fields:
+                self.timestamp_fields = timestamp_fields
+                rows = read_rows(path, file_format)
+                for number, chunk in enumerate(
+                        chunked(rows, options['chunk_size'])):
+                    offset = number * options['chunk_size']
+                    objects = self.validate(model, chunk, offset)
+                    try:
+                        with transaction.atomic():
+                            model.objects.bulk_create(
+                                objects, batch_size=options['batch_size'])
+                    except IntegrityError as error:
+                        raise CommandError(
+                            f'строки {offset + 1}-{offset + len(chunk)}: '
+                            f'{error}')
+                    imported += len(objects)
+                    skipped += len(chunk) - len(objects)
+                    self.report(imported, skipped, started)
+        finally:
+            # bulk_create не вызывает сигналы. Пачки до ошибки уже
+            # сохранены, и счётчики, поиск и ленты должны их учесть.
+            if imported:
+                reset_sequences(model)
+                rebuild_derived_data([model])
+        self.stdout.write(self.style.SUCCESS(
+            f'Загружено {imported}, пропущено {skipped}'
+        ))
+
+    def validate(self, model, rows, offset):
+        """Проверяет пачку строк; внешние ключи - одним запросом на поле."""
+        objects = []
+        for line, row in enumerate(rows, start=offset + 1):
+            try:
+                objects.append((line, self.build(model, row)))
+            except (ValidationError, TypeError, ValueError) as error:
+                self.reject(line, error)
+        for field in self.foreign_keys:
+            ids = {getattr(obj, field.attname) for _, obj in objects}
+            known = set(field.related_model.objects.filter(
+                pk__in=ids - {None}).values_list('pk', flat=True))
+            valid = []
+            for line, obj in objects:
+                value = getattr(obj, field.attname)
+                if value in known or value is None and field.null:
+                    valid.append((line, obj))
+                else:
+                    self.reject(
+                        line, f'{field.name}: нет объекта с id {value}')
+            objects = valid
+        objects = self.deduplicate(model, objects)
+        return [obj for _, obj in objects]
+
+    def deduplicate(self, model, objects):
+        """Отбрасывает повторы уникальных полей: в файле и уже в базе."""
+        unique_fields = [
+            (field.name,) for field in self.fields.values() if field.unique
+        ] + list(model._meta.unique_together)
+        for names in unique_fields:
+            attnames = [model._meta.get_field(name).attname for name in names]
+            keys = {
+                tuple(getattr(obj, attname) for attname in attnames)
+                for _, obj in objects
+            }
+            keys = {key for key in keys if None not in key}
+            if not keys:
+                continue
+            # Фильтр по каждому полю отдельно шире нужного,
+            # лишние ключи просто не совпадут.
+            seen = set(model.objects.filter(**{
+                f'{attname}__in': {key[index] for key in keys}
+                for index, attname in enumerate(attnames)
+            }).values_list(*attnames))
+            valid = []
+            for line, obj in objects:
+                key = tuple(getattr(obj, attname) for attname in attnames)
+                if key in seen:
+                    self.reject(
+                        line, f'{", ".join(names)}: такая запись уже есть')
+                    continue
+                if None not in key:
+                    seen.add(key)
+                valid.append((line, obj))
+            objects = valid
+        return objects
+
+    def build(self, model, row):
+        unknown = set(row) - set(self.fields)
+        if unknown:
+            raise ValueError(f'неизвестные поля: {", ".join(sorted(unknown))}')
+        obj = model(**{
+            name: value for name, value in row.items() if value != ''
+        })
+        obj.clean_fields(
+            exclude=[field.name for field in self.foreign_keys])
+        for field in self.foreign_keys:
+            value = getattr(obj, field.attname)
+            if value is not None:
+                setattr(obj, field.attname, field.target_field.to_python(
+                    value))
+        for field in self.timestamp_fields:
+            value = getattr(obj, field.attname)
+            if value is None:
+                setattr(obj, field.attname, timezone.now())
+            elif timezone.is_naive(value):
+                setattr(obj, field.attname, timezone.make_aware(value))
+        return obj
+
+    def reject(self, line, error):
+        message = f'строка {line}: {error}'
+        if self.strict:
+            raise CommandError(message)
+        self.stderr.write(message)
+
+    def report(self, imported, skipped, started):
+        elapsed = time.monotonic() - started or 1e-9
+        self.stdout.write(
+            f'{imported} строк, {skipped} пропущено, '
+            f'{imported / elapsed:.0f} строк/с'
+        )
@@ -0,0 +1,55 @@
+# Generated by Django 2.2.16 on 2026-10-18 18:33
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+from posts.counters import recount_all
+
+
+def remove_duplicate_follows(apps, schema_editor):
+    """Оставляет самую раннюю из повторных подписок."""
+    Follow = apps.get_model('posts', 'Follow')
+    duplicates = Follow.objects.values('user', 'author').annotate(
+        first=Min('id'), total=Count('id')).filter(total__gt=1)
+    removed = 0
+    for row in duplicates.iterator():
+        removed += Follow.objects.filter(
+            user=row['user'], author=row['author'],
+        ).exclude(id=row['first']).delete()[0]
+    if removed:
+        recount_all(apps)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0007_post_fts'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='group',
+            name='title',
+            field=models.CharField(db_index=True, max_length=200, verbose_name='Название'),
+        ),
+        migrations.RunPython(
+            remove_duplicate_follows, migrations.RunPython.noop),
+        migrations.AlterUniqueTogether(
+            name='follow',
+            unique_together={('user', 'author')},
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['post', '-created'], name='comment_post_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['author', '-pub_date', '-id'], name='post_author_feed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['group', '-pub_date', '-id'], name='post_group_feed_idx'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+from django.conf import settings
+from django.db import migrations
+
+# Выражение совпадает с тем, что строит SearchVector('text', config=...),
+# иначе планировщик PostgreSQL не возьмёт индекс.
+CREATE_INDEX = (
+    'CREATE INDEX posts_post_text_fts ON posts_post USING GIN '
+    "(to_tsvector(%s::regconfig, COALESCE(text, '')))"
+)
+
+
+def create_fts_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(CREATE_INDEX, [settings.SEARCH_CONFIG])
+
+
+def drop_fts_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX IF EXISTS posts_post_text_fts')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0009_comment_ordering_tiebreak'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_fts_index, drop_fts_index),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 2.2.16 on 2026-10-18 19:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0010_post_fts_postgres'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='post',
+            name='thumbnail',
+            field=models.ImageField(blank=True, default='', editable=False, upload_to='', verbose_name='Миниатюра'),
+        ),
+    ]
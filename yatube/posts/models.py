@@ -9,6 +9,7 @@ User = get_user_model()
 class Group(models.Model):
     title = models.CharField(
         max_length=200,
+        db_index=True,
         verbose_name='Название'
     )
     slug = models.SlugField(
@@ -19,6 +20,11 @@ class Group(models.Model):
     description = models.TextField(
         verbose_name='Описание'
     )
+    posts_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Число постов'
+    )
 
     class Meta:
         verbose_name = 'Группа'
@@ -29,6 +35,12 @@ class Group(models.Model):
         return self.title
 
 
+class PostQuerySet(models.QuerySet):
+    def feed(self):
+        """Посты для карточек ленты: автор и группа одним запросом."""
+        return self.select_related('author', 'group')
+
+
 class Post(models.Model):
     text = models.TextField(
         help_text='Текст нового поста',
@@ -59,15 +71,46 @@ class Post(models.Model):
         blank=True,
         verbose_name='Картинка',
     )
+    thumbnail = models.ImageField(
+        blank=True,
+        default='',
+        editable=False,
+        verbose_name='Миниатюра',
+    )
+    comments_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Число комментариев'
+    )
+
+    objects = PostQuerySet.as_manager()
 
     class Meta:
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
-        ordering = ('-pub_date',)
+        ordering = ('-pub_date', '-id')
+        # Ленты автора и группы: фильтр и сортировка по одному индексу.
+        indexes = (
+            models.Index(
+                fields=('author', '-pub_date', '-id'),
+                name='post_author_feed_idx',
+            ),
+            models.Index(
+                fields=('group', '-pub_date', '-id'),
+                name='post_group_feed_idx',
+            ),
+        )
 
     def __str__(self):
         return self.text[:settings.CHARS_LENGTH]
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Группа на момент загрузки нужна счётчикам при редактировании.
+        instance._loaded_group_id = instance.__dict__.get('group_id')
+        return instance
+
 
 class Comment(models.Model):
     post = models.ForeignKey(
@@ -94,7 +137,14 @@ class Comment(models.Model):
     class Meta:
         verbose_name_plural = 'Комментарии'
         verbose_name = 'Комментарий'
-        ordering = ('-created', )
+        ordering = ('-created', '-id')
+        # Страница комментариев поста выбирается по курсору (created, id).
+        indexes = (
+            models.Index(
+                fields=('post', '-created', '-id'),
+                name='comment_post_feed_idx',
+            ),
+        )
 
     def __str__(self):
         return self.text[:settings.CHARS_LENGTH]
@@ -117,6 +167,72 @@ class Follow(models.Model):
     class Meta:
         verbose_name_plural = 'Подписки'
         verbose_name = 'Подписка'
+        unique_together = ('user', 'author')
 
     def __str__(self):
         return f'{self.user} подписался на {self.author}'
+
+
+class Timeline(models.Model):
+    """Запись домашней ленты подписчика, заполняется при публикации."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline',
+        verbose_name='Подписчик'
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries',
+        verbose_name='Пост'
+    )
+    # Копия даты поста: лента листается по своему индексу
+    # без join и сортировки постов.
+    pub_date = models.DateTimeField(
+        verbose_name='Дата публикации поста'
+    )
+
+    class Meta:
+        verbose_name_plural = 'Ленты подписок'
+        verbose_name = 'Запись ленты подписок'
+        unique_together = ('user', 'post')
+        # Лента подписок листается по курсору (pub_date, post).
+        indexes = (
+            models.Index(
+                fields=('user', '-pub_date', '-post'),
+                name='timeline_user_feed_idx',
+            ),
+        )
+
+    def __str__(self):
+        return f'{self.post} в ленте {self.user}'
+
+
+class UserStats(models.Model):
+    """Счётчики пользователя, обновляются вместе с постами и подписками."""
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        related_name='stats',
+        verbose_name='Пользователь'
+    )
+    posts_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Число постов'
+    )
+    followers_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Число подписчиков'
+    )
+    following_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Число подписок'
+    )
+
+    class Meta:
+        verbose_name_plural = 'Счётчики пользователей'
+        verbose_name = 'Счётчики пользователя'
+
+    def __str__(self):
+        return f'Счётчики {self.user}'
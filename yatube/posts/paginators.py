@@ -0,0 +1,121 @@
+import base64
+import binascii
+
+from django.core.paginator import EmptyPage, Page, Paginator
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+
+def encode_cursor(obj, field='pub_date'):
+    """Кодирует позицию объекта в ленте в непрозрачный токен."""
+    raw = f'{getattr(obj, field).isoformat()}|{obj.pk}'
+    token = base64.urlsafe_b64encode(raw.encode())
+    return token.decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Возвращает пару (значение поля, pk) или None для битого токена."""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode()).decode()
+        value, pk = raw.rsplit('|', 1)
+        value = parse_datetime(value)
+        pk = int(pk)
+    except (ValueError, TypeError, UnicodeError, binascii.Error):
+        return None
+    if value is None:
+        return None
+    return value, pk
+
+
+class CountedPaginator(Paginator):
+    """Paginator с заранее известным числом объектов.
+
+    count берётся из счётчиков или кэша, а не из COUNT(*), и может
+    отставать от таблицы или быть оценкой. Он задаёт только ряд
+    номеров страниц; есть ли следующая, решает выборка per_page + 1
+    строк, так что заниженный count не отрезает старые посты.
+    """
+
+    def __init__(self, object_list, per_page, count=None, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        if count is not None:
+            self.count = count
+
+    def validate_number(self, number):
+        try:
+            return super().validate_number(number)
+        except EmptyPage:
+            # Страница за num_pages может существовать: это проверит
+            # выборка в page().
+            if int(number) < 1:
+                raise
+            return int(number)
+
+    def page(self, number):
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        objects = list(self.object_list[bottom:bottom + self.per_page + 1])
+        if not objects and number > self.num_pages:
+            raise EmptyPage('That page contains no results')
+        page = self._get_page(objects[:self.per_page], number, self)
+        # Страница остаётся Page, но has_next берётся из выборки.
+        has_next = len(objects) > self.per_page
+        page.has_next = lambda: has_next
+        return page
+
+
+def cursor_page(object_list, paginator, has_next, has_previous):
+    """Страница ленты, открытая по курсору ?after=.
+
+    Не знает своего номера и общего числа страниц, поэтому
+    не обращается к paginator.count. Остаётся обычным Page:
+    has_next и has_previous берутся из выборки.
+    """
+    # Без объектов на странице продолжать ленту не от чего.
+    has_next = has_next and bool(object_list)
+    page = Page(object_list, None, paginator)
+    page.is_cursor = True
+    page.has_next = lambda: has_next
+    page.has_previous = lambda: has_previous
+    page.next_cursor = None
+    if has_next:
+        page.next_cursor = encode_cursor(object_list[-1], paginator.field)
+    return page
+
+
+class CursorPaginator(Paginator):
+    """Пагинация по ключу (field, key) без COUNT(*) и OFFSET.
+
+    Стоимость страницы не зависит от её глубины: выборка идёт
+    по индексу от позиции, закодированной в курсоре. key - поле
+    с pk объекта страницы, если object_list выбирает не сами объекты.
+    """
+
+    def __init__(self, object_list, per_page, field='pub_date', key='pk',
+                 **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.field = field
+        self.key = key
+
+    def load(self, rows):
+        """Объекты страницы по строкам выборки."""
+        return rows
+
+    def page_after(self, cursor):
+        queryset = self.object_list.order_by(
+            f'-{self.field}', f'-{self.key}')
+        position = decode_cursor(cursor) if cursor else None
+        if position is not None:
+            value, pk = position
+            queryset = queryset.filter(
+                Q(**{f'{self.field}__lt': value})
+                | Q(**{self.field: value, f'{self.key}__lt': pk})
+            )
+        rows = list(queryset[:self.per_page + 1])
+        return cursor_page(
+            self.load(rows[:self.per_page]),
+            self,
+            has_next=len(rows) > self.per_page,
+            has_previous=position is not None,
+        )
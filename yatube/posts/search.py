@@ -0,0 +1,105 @@
+from django.conf import settings
+from django.db import connection
+from django.utils.functional import SimpleLazyObject
+from django.utils.module_loading import import_string
+
+from .models import Post
+
+FTS_TABLE = 'posts_post_fts'
+
+
+class SqliteSearchBackend:
+    """Полнотекстовый поиск по индексу FTS5 в SQLite.
+
+    Текст постов дублируется в виртуальную таблицу posts_post_fts
+    (rowid = id поста), которая обновляется сигналами.
+    """
+
+    @staticmethod
+    def to_match(term):
+        # Каждое слово - отдельная фраза в кавычках: синтаксис FTS5
+        # из пользовательского ввода не интерпретируется.
+        words = term.split()
+        return ' '.join('"{}"'.format(word.replace('"', '""'))
+                        for word in words)
+
+    def search(self, queryset, term):
+        match = self.to_match(term)
+        if not match:
+            return queryset.none()
+        return queryset.extra(
+            tables=[FTS_TABLE],
+            where=[
+                f'{FTS_TABLE}.rowid = posts_post.id',
+                f'{FTS_TABLE} MATCH %s',
+            ],
+            params=[match],
+            select={'rank': f'{FTS_TABLE}.rank'},
+            order_by=['rank', '-pub_date'],
+        )
+
+    def index(self, post):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [post.pk])
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE} (rowid, text) VALUES (%s, %s)',
+                [post.pk, post.text],
+            )
+
+    def remove(self, post_id):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [post_id])
+
+    def rebuild(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE}')
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE} (rowid, text) '
+                f'SELECT id, text FROM posts_post'
+            )
+
+
+class PostgresSearchBackend:
+    """Поиск средствами PostgreSQL (to_tsvector / ts_rank).
+
+    Отдельной таблицы нет: GIN-индекс по to_tsvector(SEARCH_CONFIG, text)
+    создаёт миграция 0010_post_fts_postgres. После смены SEARCH_CONFIG
+    индекс нужно пересоздать.
+    """
+
+    def search(self, queryset, term):
+        from django.contrib.postgres.search import (
+            SearchQuery, SearchRank, SearchVector,
+        )
+
+        config = settings.SEARCH_CONFIG
+        vector = SearchVector('text', config=config)
+        query = SearchQuery(term, config=config)
+        return queryset.annotate(
+            search=vector, rank=SearchRank(vector, query)
+        ).filter(search=query).order_by('-rank', '-pub_date')
+
+    def index(self, post):
+        pass
+
+    def remove(self, post_id):
+        pass
+
+    def rebuild(self):
+        pass
+
+
+def get_search_backend():
+    return import_string(settings.SEARCH_BACKEND)()
+
+
+backend = SimpleLazyObject(get_search_backend)
+
+
+def search_posts(term, queryset=None):
+    """Посты, найденные по term, от самых релевантных."""
+    if queryset is None:
+        queryset = Post.objects.all()
+    return backend.search(queryset, term)
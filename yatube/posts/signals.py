@@ -0,0 +1,116 @@
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import counters, search, timeline
+from .caching import bump_generation
+from .models import Comment, Follow, Group, Post, UserStats
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def create_user_stats(sender, instance, created, **kwargs):
+    if created:
+        UserStats.objects.get_or_create(user=instance)
+
+
+@receiver(post_save, sender=Post)
+def push_post_to_timelines(sender, instance, created, **kwargs):
+    if created:
+        timeline.fan_out(instance)
+
+
+@receiver(post_save, sender=Post)
+def count_post(sender, instance, created, **kwargs):
+    if created:
+        old_group_id = None
+        counters.change(
+            UserStats, 1, 'posts_count', user_id=instance.author_id)
+        counters.change_total(1)
+    else:
+        old_group_id = getattr(
+            instance, '_loaded_group_id', instance.group_id)
+    if old_group_id != instance.group_id:
+        if old_group_id:
+            counters.change(Group, -1, 'posts_count', pk=old_group_id)
+        if instance.group_id:
+            counters.change(Group, 1, 'posts_count', pk=instance.group_id)
+    instance._loaded_group_id = instance.group_id
+
+
+@receiver(post_delete, sender=Post)
+def uncount_post(sender, instance, **kwargs):
+    counters.change(UserStats, -1, 'posts_count', user_id=instance.author_id)
+    counters.change_total(-1)
+    if instance.group_id:
+        counters.change(Group, -1, 'posts_count', pk=instance.group_id)
+
+
+@receiver(post_save, sender=Comment)
+def count_comment(sender, instance, created, **kwargs):
+    if created:
+        counters.change(Post, 1, 'comments_count', pk=instance.post_id)
+
+
+@receiver(post_delete, sender=Comment)
+def uncount_comment(sender, instance, **kwargs):
+    counters.change(Post, -1, 'comments_count', pk=instance.post_id)
+
+
+@receiver(post_save, sender=Follow)
+def backfill_timeline(sender, instance, created, **kwargs):
+    if created:
+        timeline.backfill(instance.user, instance.author)
+
+
+@receiver(post_save, sender=Follow)
+def count_follow(sender, instance, created, **kwargs):
+    if created:
+        counters.change(
+            UserStats, 1, 'following_count', user_id=instance.user_id)
+        counters.change(
+            UserStats, 1, 'followers_count', user_id=instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def trim_timeline(sender, instance, **kwargs):
+    timeline.trim(instance.user, instance.author)
+
+
+@receiver(post_delete, sender=Follow)
+def uncount_follow(sender, instance, **kwargs):
+    counters.change(
+        UserStats, -1, 'following_count', user_id=instance.user_id)
+    counters.change(
+        UserStats, -1, 'followers_count', user_id=instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def refill_timelines(sender, instance, **kwargs):
+    timeline.refill(instance.author_id)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_feeds(sender, **kwargs):
+    bump_generation()
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def invalidate_feeds_on_author_change(sender, update_fields, **kwargs):
+    # Вход пользователя обновляет только last_login - ленты не меняются.
+    if update_fields != frozenset(['last_login']):
+        bump_generation()
+
+
+@receiver(post_save, sender=Post)
+def index_post(sender, instance, **kwargs):
+    search.backend.index(instance)
+
+
+@receiver(post_delete, sender=Post)
+def unindex_post(sender, instance, **kwargs):
+    search.backend.remove(instance.pk)
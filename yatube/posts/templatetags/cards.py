@@ -0,0 +1,59 @@
+import hashlib
+
+from django import template
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import get_template
+from django.utils.safestring import mark_safe
+
+from core import metrics
+
+register = template.Library()
+
+
+def card_version(post, show_link, show_author):
+    """Версия карточки: меняется при правке поста, группы или автора."""
+    group = post.group
+    parts = (
+        post.text,
+        post.image.name,
+        post.thumbnail.name,
+        post.pub_date.isoformat(),
+        post.comments_count,
+        group.slug if group else '',
+        post.author.username,
+        post.author.get_full_name(),
+        show_link,
+        show_author,
+    )
+    return hashlib.md5(repr(parts).encode()).hexdigest()
+
+
+def card_key(post, show_link, show_author):
+    return f'card:{post.pk}:{card_version(post, show_link, show_author)}'
+
+
+@register.simple_tag
+def post_cards(posts, show_link=False, show_author=False):
+    """Карточки ленты: готовые берутся из кэша одним запросом."""
+    posts = list(posts)
+    keys = [card_key(post, show_link, show_author) for post in posts]
+    cached = cache.get_many(keys)
+    card_template = get_template('includes/card.html')
+    rendered = {}
+    cards = []
+    for post, key in zip(posts, keys):
+        card = cached.get(key)
+        if card is None:
+            card = card_template.render({
+                'post': post,
+                'show_link': show_link,
+                'show_author': show_author,
+            })
+            rendered[key] = card
+        cards.append(mark_safe(card))
+    if rendered:
+        cache.set_many(rendered, settings.CARD_CACHE_TIMEOUT)
+    metrics.record_event('card_hits', len(cached))
+    metrics.record_event('card_misses', len(rendered))
+    return cards
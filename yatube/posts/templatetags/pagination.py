@@ -0,0 +1,37 @@
+from django import template
+from django.conf import settings
+
+register = template.Library()
+
+
+def elided_page_range(number, num_pages, on_each_side=3, on_ends=1):
+    """Номера страниц вокруг текущей и по краям; None - пропуск.
+
+    Длина не зависит от числа страниц: не больше
+    2 * (on_each_side + on_ends) + 3 элементов.
+    """
+    # Многоточие ставится, только если скрывает хотя бы две страницы.
+    start = number - on_each_side
+    if start <= on_ends + 2:
+        start = 1
+    else:
+        yield from range(1, on_ends + 1)
+        yield None
+    end = number + on_each_side
+    if end >= num_pages - on_ends - 1:
+        yield from range(start, num_pages + 1)
+    else:
+        yield from range(start, end + 1)
+        yield None
+        yield from range(num_pages - on_ends + 1, num_pages + 1)
+
+
+@register.simple_tag
+def page_window(page_obj):
+    """Номера страниц для пагинатора ленты, см. elided_page_range."""
+    return list(elided_page_range(
+        page_obj.number,
+        page_obj.paginator.num_pages,
+        on_each_side=settings.PAGINATOR_ON_EACH_SIDE,
+        on_ends=settings.PAGINATOR_ON_ENDS,
+    ))
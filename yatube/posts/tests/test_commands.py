@@ -0,0 +1,266 @@
+import gzip
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from .. import maintenance
+from ..deletion import delete_files, get_progress
+from ..models import Comment, Follow, Group, Post, Timeline
+from ..search import search_posts
+
+User = get_user_model()
+
+
+class ImportDataTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа',
+            slug='group',
+            description='Тестовое описание'
+        )
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+
+    def write(self, name, content):
+        path = os.path.join(self.tmp_dir, name)
+        with open(path, 'w', encoding='utf-8') as target:
+            target.write(content)
+        return path
+
+    def import_data(self, *args, **options):
+        stdout, stderr = StringIO(), StringIO()
+        call_command(
+            'import_data', *args, stdout=stdout, stderr=stderr, **options)
+        return stdout.getvalue(), stderr.getvalue()
+
+    def test_import_posts_jsonl(self):
+        """Посты загружаются с датами из файла, битые строки пропускаются."""
+        rows = [
+            {'text': 'Старый пост', 'author_id': self.author.pk,
+             'group_id': self.group.pk, 'pub_date': '2001-02-03T04:05:06'},
+            {'text': 'Новый пост', 'author_id': self.author.pk},
+            {'text': 'Без автора', 'author_id': 9999},
+            {'text': '', 'author_id': self.author.pk},
+        ]
+        path = self.write(
+            'posts.jsonl', '\n'.join(json.dumps(row) for row in rows))
+
+        stdout, stderr = self.import_data(
+            'post', path, chunk_size=2, batch_size=1)
+
+        self.assertIn('Загружено 2, пропущено 2', stdout)
+        self.assertIn('строка 3', stderr)
+        self.assertIn('строка 4', stderr)
+        old_post = Post.objects.get(text='Старый пост')
+        self.assertEqual(old_post.pub_date.year, 2001)
+        self.assertEqual(old_post.group, self.group)
+        new_post = Post.objects.get(text='Новый пост')
+        self.assertGreater(new_post.pub_date, old_post.pub_date)
+        self.author.stats.refresh_from_db()
+        self.assertEqual(self.author.stats.posts_count, 2)
+        self.assertEqual(list(search_posts('Старый')), [old_post])
+
+    def test_import_follows_csv(self):
+        """Подписки из CSV попадают в ленты подписчиков."""
+        post = Post.objects.create(text='Пост', author=self.author)
+        path = self.write(
+            'follows.csv',
+            f'user_id,author_id\n{self.reader.pk},{self.author.pk}\n'
+        )
+
+        self.import_data('follow', path)
+
+        self.assertTrue(
+            Follow.objects.filter(user=self.reader, author=self.author)
+            .exists())
+        self.assertTrue(
+            Timeline.objects.filter(user=self.reader, post=post).exists())
+
+    def test_import_duplicate_follows(self):
+        """Повторные и уже существующие подписки пропускаются."""
+        other = User.objects.create_user(username='other')
+        Follow.objects.create(user=self.reader, author=self.author)
+        path = self.write('follows.csv', (
+            'user_id,author_id\n'
+            f'{self.reader.pk},{self.author.pk}\n'
+            f'{other.pk},{self.author.pk}\n'
+            f'{other.pk},{self.author.pk}\n'
+        ))
+
+        stdout, stderr = self.import_data('follow', path, chunk_size=2)
+
+        self.assertIn('Загружено 1, пропущено 2', stdout)
+        self.assertIn('строка 1', stderr)
+        self.assertIn('строка 3', stderr)
+        self.assertEqual(
+            Follow.objects.filter(author=self.author).count(), 2)
+
+    def test_import_failure_keeps_derived_data(self):
+        """После ошибки сохранённые пачки учтены в счётчиках и поиске."""
+        rows = [
+            {'text': 'Первая пачка', 'author_id': self.author.pk},
+            {'text': '', 'author_id': self.author.pk},
+        ]
+        path = self.write(
+            'posts.jsonl', '\n'.join(json.dumps(row) for row in rows))
+
+        with self.assertRaises(CommandError):
+            self.import_data('post', path, chunk_size=1, strict=True)
+
+        post = Post.objects.get(text='Первая пачка')
+        self.author.stats.refresh_from_db()
+        self.assertEqual(self.author.stats.posts_count, 1)
+        self.assertEqual(list(search_posts('пачка')), [post])
+
+    def test_import_rebuilds_only_affected_data(self):
+        """Загрузка групп не трогает ленты и поиск, постов - трогает."""
+        groups = self.write('groups.jsonl', json.dumps(
+            {'title': 'Новая группа', 'slug': 'new', 'description': '-'}))
+        posts = self.write('posts.jsonl', json.dumps(
+            {'id': 500, 'text': 'Пост с id', 'author_id': self.author.pk}))
+        with mock.patch.object(maintenance.timeline, 'rebuild') as timeline, \
+                mock.patch.object(maintenance, 'backend') as backend:
+            self.import_data('group', groups)
+            timeline.assert_not_called()
+            backend.rebuild.assert_not_called()
+            self.import_data('post', posts)
+            timeline.assert_called_once_with()
+            backend.rebuild.assert_called_once_with()
+        # Последовательность id сдвинута за загруженный.
+        post = Post.objects.create(text='Новый пост', author=self.author)
+        self.assertGreater(post.pk, 500)
+
+    def test_import_strict(self):
+        """С --strict загрузка останавливается на ошибке."""
+        path = self.write('groups.jsonl', json.dumps({'title': 'Без слага'}))
+        with self.assertRaises(CommandError):
+            self.import_data('group', path, strict=True)
+        self.assertFalse(Group.objects.filter(title='Без слага').exists())
+
+
+class ExportDataTest(TestCase):
+    def test_export_comments(self):
+        """Команда выгружает комментарии автора в сжатый CSV."""
+        author = User.objects.create_user(username='author')
+        post = Post.objects.create(text='Пост', author=author)
+        post.comments.create(author=author, text='Комментарий')
+        tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp_dir)
+        path = os.path.join(tmp_dir, 'comments.csv.gz')
+
+        call_command(
+            'export_data', '--user=author', kind='comments', format='csv',
+            gzip=True, output=path)
+
+        with gzip.open(path, 'rt', encoding='utf-8') as source:
+            lines = source.read().splitlines()
+        self.assertEqual(lines[0], 'id,post_id,author_id,text,created')
+        self.assertIn('Комментарий', lines[1])
+
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(
+    MEDIA_ROOT=TEMP_MEDIA_ROOT, THUMBNAIL_WORKERS=0,
+    USER_DELETION_IN_BACKGROUND=False,
+)
+class DeleteUserTest(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='author')
+        self.reader = User.objects.create_user(username='reader')
+        self.other_post = Post.objects.create(
+            text='Чужой пост', author=self.reader)
+        Follow.objects.create(user=self.reader, author=self.author)
+        Follow.objects.create(user=self.author, author=self.reader)
+        for number in range(5):
+            post = Post.objects.create(
+                text=f'Пост {number}', author=self.author)
+            Comment.objects.create(
+                post=post, author=self.reader, text='Комментарий')
+        Comment.objects.create(
+            post=self.other_post, author=self.author, text='Комментарий')
+
+    def assertDeleted(self):
+        self.assertFalse(User.objects.filter(username='author').exists())
+        self.assertFalse(Post.objects.filter(text__startswith='Пост').exists())
+        self.assertFalse(Comment.objects.exists())
+        self.assertFalse(Follow.objects.exists())
+        self.assertFalse(Timeline.objects.exists())
+        self.reader.stats.refresh_from_db()
+        self.assertEqual(self.reader.stats.followers_count, 0)
+        self.assertEqual(self.reader.stats.following_count, 0)
+        self.other_post.refresh_from_db()
+        self.assertEqual(self.other_post.comments_count, 0)
+
+    def test_delete_user_command(self):
+        """Команда удаляет пользователя и его контент пачками."""
+        out = StringIO()
+        call_command('delete_user', 'author', batch_size=2, stdout=out)
+        self.assertDeleted()
+        output = out.getvalue()
+        self.assertIn('posts: 2/5', output)
+        self.assertIn('posts: 5/5', output)
+        self.assertIn('comments: 6/6', output)
+
+    def test_delete_user_command_unknown(self):
+        with self.assertRaises(CommandError):
+            call_command('delete_user', 'nobody', stdout=StringIO())
+
+    def test_admin_action(self):
+        """Действие админки удаляет выбранных пользователей."""
+        admin = User.objects.create_superuser(
+            'admin', 'admin@example.com', 'password')
+        client = Client()
+        client.force_login(admin)
+        response = client.post(reverse('admin:auth_user_changelist'), {
+            'action': 'delete_in_batches',
+            '_selected_action': [self.author.pk],
+        })
+        self.assertEqual(response.status_code, 302)
+        self.assertDeleted()
+        self.assertIsNone(get_progress(self.author.pk))
+
+    def test_delete_files_keeps_shared_images(self):
+        """Картинка удаляется, только если на неё не ссылаются посты."""
+        shared = default_storage.save(
+            'posts/shared.gif', SimpleUploadedFile('shared.gif', SMALL_GIF))
+        single = default_storage.save(
+            'posts/single.gif', SimpleUploadedFile('single.gif', SMALL_GIF))
+        Post.objects.create(text='Картинка', author=self.reader, image=shared)
+        delete_files([shared, single, ''])
+        self.assertTrue(default_storage.exists(shared))
+        self.assertFalse(default_storage.exists(single))
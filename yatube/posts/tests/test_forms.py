@@ -1,6 +1,8 @@
 import shutil
 import tempfile
+from concurrent.futures.process import BrokenProcessPool
 from http import HTTPStatus
+from unittest import mock
 
 from django.contrib.auth import get_user_model
 from django.core.files.uploadedfile import SimpleUploadedFile
@@ -8,13 +10,14 @@ from django.test import Client, TestCase, override_settings
 from django.conf import settings
 from django.urls import reverse
 
+from .. import thumbnails
 from ..models import Comment, Group, Post
 
 User = get_user_model()
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
 
 
-@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, THUMBNAIL_WORKERS=0)
 class PostFormTests(TestCase):
     @classmethod
     def setUpClass(cls):
@@ -89,6 +92,30 @@ class PostFormTests(TestCase):
         self.assertEqual(post.author, self.post_author)
         self.assertEqual(post.group_id, form_data['group'])
         self.assertEqual(post.image, f'posts/{uploaded}')
+        self.assertTrue(post.thumbnail)
+        self.assertContains(response, post.thumbnail.url)
+
+    @override_settings(THUMBNAIL_WORKERS=1)
+    def test_broken_thumbnail_pool(self):
+        """Сломанный пул не роняет создание поста и сбрасывается."""
+        executor = mock.Mock()
+        executor.submit.side_effect = BrokenProcessPool
+        uploaded = SimpleUploadedFile(
+            name='small_broken.gif',
+            content=self.small_gif,
+            content_type='image/gif'
+        )
+        with mock.patch.object(thumbnails, '_executor', executor):
+            response = self.authorized_user.post(
+                reverse('posts:post_create'),
+                data={'text': 'Текст поста', 'image': uploaded},
+                follow=True
+            )
+            self.assertIsNone(thumbnails._executor)
+        executor.shutdown.assert_called_once_with(wait=False)
+        post = Post.objects.latest('id')
+        self.assertFalse(post.thumbnail)
+        self.assertContains(response, 'card-img-top')
 
     def test_authorized_user_author_edit_post(self):
         """Проверка редактирования записи автором."""
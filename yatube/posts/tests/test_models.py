@@ -1,8 +1,14 @@
+from io import StringIO
+
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.core.management import call_command
+from django.core.cache import cache
+from django.db import IntegrityError, connection, transaction
+from django.test import TestCase, override_settings
 from django.conf import settings
 
-from .. models import Comment, Follow, Group, Post
+from ..counters import total_posts
+from .. models import Comment, Follow, Group, Post, UserStats
 
 User = get_user_model()
 
@@ -94,6 +100,11 @@ class FollowModelTest(TestCase):
                 verbose_name = self.follow._meta.get_field(value).verbose_name
                 self.assertEqual(verbose_name, expected)
 
+    def test_follow_unique(self):
+        """Повторная подписка на того же автора невозможна."""
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Follow.objects.create(user=self.user, author=self.another_user)
+
 
 class CommentModelTest(TestCase):
     @classmethod
@@ -131,3 +142,107 @@ class CommentModelTest(TestCase):
             with self.subTest(value=value):
                 verbose_name = self.comment._meta.get_field(value).verbose_name
                 self.assertEqual(verbose_name, expected)
+
+
+class CountersTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа',
+            slug='group',
+            description='Тестовое описание'
+        )
+        cls.other_group = Group.objects.create(
+            title='Другая группа',
+            slug='other-group',
+            description='Тестовое описание'
+        )
+
+    def assertCounters(self, obj, **expected):
+        obj.refresh_from_db()
+        for field, value in expected.items():
+            with self.subTest(obj=obj, field=field):
+                self.assertEqual(getattr(obj, field), value)
+
+    def test_post_counters(self):
+        """Счётчики постов автора и группы следуют за постами."""
+        post = Post.objects.create(
+            text='Пост', author=self.author, group=self.group)
+        self.assertCounters(self.author.stats, posts_count=1)
+        self.assertCounters(self.group, posts_count=1)
+
+        post = Post.objects.get(pk=post.pk)
+        post.group = self.other_group
+        post.save()
+        self.assertCounters(self.group, posts_count=0)
+        self.assertCounters(self.other_group, posts_count=1)
+
+        post.delete()
+        self.assertCounters(self.author.stats, posts_count=0)
+        self.assertCounters(self.other_group, posts_count=0)
+
+    def test_comment_and_follow_counters(self):
+        """Счётчики комментариев и подписок следуют за записями."""
+        post = Post.objects.create(text='Пост', author=self.author)
+        comment = Comment.objects.create(
+            post=post, author=self.reader, text='Комментарий')
+        follow = Follow.objects.create(user=self.reader, author=self.author)
+        self.assertCounters(post, comments_count=1)
+        self.assertCounters(self.author.stats, followers_count=1)
+        self.assertCounters(self.reader.stats, following_count=1)
+
+        comment.delete()
+        follow.delete()
+        self.assertCounters(post, comments_count=0)
+        self.assertCounters(self.author.stats, followers_count=0)
+        self.assertCounters(self.reader.stats, following_count=0)
+
+    def test_recount_counters(self):
+        """Команда recount_counters чинит разъехавшиеся счётчики."""
+        post = Post.objects.create(
+            text='Пост', author=self.author, group=self.group)
+        Comment.objects.create(
+            post=post, author=self.reader, text='Комментарий')
+        Follow.objects.create(user=self.reader, author=self.author)
+        UserStats.objects.update(
+            posts_count=100, followers_count=100, following_count=100)
+        Post.objects.update(comments_count=100)
+        Group.objects.update(posts_count=100)
+
+        call_command('recount_counters', stdout=StringIO())
+
+        self.assertCounters(
+            self.author.stats,
+            posts_count=1, followers_count=1, following_count=0)
+        self.assertCounters(self.reader.stats, following_count=1)
+        self.assertCounters(post, comments_count=1)
+        self.assertCounters(self.group, posts_count=1)
+
+    def test_total_posts(self):
+        """Число постов кэшируется и сдвигается при создании и удалении."""
+        cache.clear()
+        Post.objects.create(text='Пост', author=self.author)
+        self.assertEqual(total_posts(), 1)
+        with self.assertNumQueries(0):
+            self.assertEqual(total_posts(), 1)
+        post = Post.objects.create(text='Пост', author=self.author)
+        self.assertEqual(total_posts(), 2)
+        post.delete()
+        self.assertEqual(total_posts(), 1)
+
+    @override_settings(EXACT_COUNT_THRESHOLD=0)
+    def test_total_posts_estimate(self):
+        """Оценка из статистики обновляется, а не берётся устаревшей."""
+        cache.clear()
+        Post.objects.bulk_create(
+            [Post(text='Пост', author=self.author) for _ in range(3)])
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        Post.objects.bulk_create(
+            [Post(text='Пост', author=self.author) for _ in range(2)])
+        total = Post.objects.count()
+        with self.assertNumQueries(5):
+            self.assertEqual(total_posts(), total)
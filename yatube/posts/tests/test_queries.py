@@ -0,0 +1,102 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.conf import settings
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..counters import recount_all
+from ..models import Comment, Follow, Group, Post
+from ..search import backend
+from ..urls import urlpatterns
+from .utils import QueryBudgetMixin
+
+User = get_user_model()
+
+
+class QueryBudgetTests(QueryBudgetMixin, TestCase):
+    """Число запросов не зависит от количества постов на странице."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(
+            username='author', first_name='Лев', last_name='Толстой')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.moderator = User.objects.create_user(
+            username='moderator', is_staff=True)
+        cls.groups = [
+            Group.objects.create(
+                title=f'Группа {i}',
+                slug=f'group-{i}',
+                description='Описание',
+            )
+            for i in range(3)
+        ]
+        Post.objects.bulk_create([
+            Post(
+                text=f'Пост #{i}',
+                author=cls.author,
+                group=cls.groups[i % len(cls.groups)],
+            )
+            for i in range(settings.NUMBER_POST * 2)
+        ])
+        backend.rebuild()
+        recount_all()
+        cls.post = Post.objects.filter(author=cls.author).first()
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        Comment.objects.bulk_create([
+            Comment(post=cls.post, author=user, text='Комментарий')
+            for user in (cls.author, cls.reader) * 3
+        ])
+
+    def setUp(self):
+        self.guest_client = Client()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+        self.moderator_client = Client()
+        self.moderator_client.force_login(self.moderator)
+        cache.clear()
+        # Сессия и снимок пользователя попадают в кэш с первым
+        # запросом, бюджеты считаются для следующих.
+        for client in (
+                self.reader_client, self.author_client,
+                self.moderator_client):
+            client.get(reverse('about:author'))
+
+    def get_budgets(self):
+        post_kwargs = {'post_id': self.post.id}
+        author_kwargs = {'username': self.author.username}
+        return {
+            # Число постов главной считается при пустом кэше.
+            'index': (self.guest_client.get, {}, 3),
+            'group_list': (
+                self.guest_client.get, {'slug': self.groups[0].slug}, 2),
+            'profile': (self.reader_client.get, author_kwargs, 4),
+            'search': (self.guest_client.get, {}, 2),
+            'profile_export': (self.author_client.get, author_kwargs, 2),
+            'group_export': (
+                self.moderator_client.get, {'slug': self.groups[0].slug}, 2),
+            'post_detail': (self.reader_client.get, post_kwargs, 2),
+            'post_comments': (self.guest_client.get, post_kwargs, 2),
+            'post_edit': (self.author_client.get, post_kwargs, 2),
+            'post_create': (self.reader_client.get, {}, 1),
+            'add_comment': (self.reader_client.post, post_kwargs, 3),
+            'follow_index': (self.reader_client.get, {}, 3),
+            'profile_follow': (self.reader_client.get, author_kwargs, 2),
+            'profile_unfollow': (self.reader_client.get, author_kwargs, 8),
+        }
+
+    def test_every_url_has_budget(self):
+        """У каждого адреса приложения posts есть бюджет запросов."""
+        url_names = {pattern.name for pattern in urlpatterns}
+        self.assertEqual(url_names, set(self.get_budgets()))
+
+    def test_query_budgets(self):
+        """Страницы укладываются в бюджет запросов."""
+        for name, (method, kwargs, budget) in self.get_budgets().items():
+            with self.subTest(name=name):
+                url = reverse(f'posts:{name}', kwargs=kwargs)
+                self.assertQueryBudget(
+                    budget, method, url, {'text': 'Комментарий', 'q': 'Пост'})
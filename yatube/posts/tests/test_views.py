@@ -1,15 +1,24 @@
+import gzip
+import json
 import shutil
 import tempfile
+from datetime import timedelta
+from http import HTTPStatus
 
 from django import forms
 from django.contrib.auth import get_user_model
 from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
-from django.test import Client, TestCase, override_settings
+from django.test import Client, RequestFactory, TestCase, override_settings
 from django.conf import settings
 from django.urls import reverse
 
-from ..models import Follow, Group, Post
+from core import metrics
+
+from ..caching import feed_cache_key
+from ..counters import recount_all
+from ..models import Comment, Follow, Group, Post, Timeline
+from ..templatetags.pagination import elided_page_range
 
 User = get_user_model()
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
@@ -124,7 +133,7 @@ class PostPagesTests(TestCase):
         self.check_post_info(response.context['post'])
 
     def test_cache_index_page(self):
-        """Проверка работы кэша"""
+        """Главная страница берётся из кэша, пока контент не изменился."""
         post = Post.objects.create(
             text='Текст',
             author=self.user,
@@ -132,14 +141,114 @@ class PostPagesTests(TestCase):
         )
         content_add = self.authorized_client.get(
             reverse('posts:index')).content
+        # Сессия и пользователь для шапки тоже берутся из кэша.
+        with self.assertNumQueries(0):
+            content_cached = self.authorized_client.get(
+                reverse('posts:index')).content
+        self.assertEqual(content_add, content_cached)
         post.delete()
         content_delete = self.authorized_client.get(
             reverse('posts:index')).content
-        self.assertEqual(content_add, content_delete)
+        self.assertNotEqual(content_add, content_delete)
+
+    def test_cache_shared_between_users(self):
+        """Кэш страницы общий, а шапка у каждого пользователя своя."""
+        url = reverse('posts:index')
+        other = User.objects.create_user(username='other')
+        other_client = Client()
+        other_client.force_login(other)
+        self.client.get(url)
+        for client, username in (
+                (self.authorized_client, self.user.username),
+                (other_client, other.username)):
+            client.get(reverse('about:author'))
+            with self.subTest(username=username):
+                with self.assertNumQueries(0):
+                    response = client.get(url)
+                self.assertContains(response, f'Пользователь: {username}')
+                self.assertContains(response, 'Избранные авторы')
+        self.assertNotContains(self.client.get(url), 'Пользователь:')
+
+    def test_cache_invalidated_by_group_rename(self):
+        """Переименование группы сбрасывает кэш ленты группы."""
+        url = reverse('posts:group_list', kwargs={'slug': self.group.slug})
+        content = self.client.get(url).content
+        self.group.title = 'Новое название'
+        self.group.save()
+        self.assertNotEqual(content, self.client.get(url).content)
+
+    def test_stale_page_served_while_refreshing(self):
+        """Пока страницу пересчитывают, остальным отдаётся старая версия."""
+        url = reverse('posts:index')
+        cache_key = feed_cache_key('index_page', RequestFactory().get(url))
+        stale = self.client.get(url).content
+        Post.objects.create(text='Свежий пост', author=self.user)
+        stale_before = metrics.registry.collect()['posts:index']['feed_stale']
+        cache.add(f'{cache_key}:lock', 1)
+        self.assertEqual(self.client.get(url).content, stale)
+        self.assertEqual(
+            metrics.registry.collect()['posts:index']['feed_stale'],
+            stale_before + 1,
+        )
+        cache.delete(f'{cache_key}:lock')
+        self.assertContains(self.client.get(url), 'Свежий пост')
+
+    def test_stale_page_not_validated_as_fresh(self):
+        """Старая страница не получает ETag нового поколения."""
+        url = reverse('posts:group_list', kwargs={'slug': self.group.slug})
+        cache_key = feed_cache_key('group_page', RequestFactory().get(url))
+        self.client.get(url)
+        Post.objects.create(
+            text='Свежий пост', author=self.user, group=self.group)
+        cache.add(f'{cache_key}:lock', 1)
+        response = self.client.get(url)
+        self.assertNotContains(response, 'Свежий пост')
+        self.assertIn('no-cache', response['Cache-Control'])
+        revalidated = self.client.get(
+            url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(revalidated.status_code, HTTPStatus.OK)
+        cache.delete(f'{cache_key}:lock')
+        fresh = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertContains(fresh, 'Свежий пост')
+        self.assertEqual(
+            self.client.get(
+                url, HTTP_IF_NONE_MATCH=fresh['ETag']).status_code,
+            HTTPStatus.NOT_MODIFIED,
+        )
+
+    @override_settings(FEED_CACHE_LOCK_WAIT=0)
+    def test_page_rendered_if_refresh_takes_too_long(self):
+        """Без старой версии страница рендерится, но не кэшируется."""
+        url = reverse('posts:index')
+        cache_key = feed_cache_key('index_page', RequestFactory().get(url))
+        cache.add(f'{cache_key}:lock', 1)
+        self.assertContains(self.client.get(url), self.post.text)
+        self.assertIsNone(cache.get(cache_key))
+
+    def test_card_fragment_cache(self):
+        """Карточки берутся из кэша и обновляются после правки поста."""
+        url = reverse('posts:profile', kwargs={'username': self.user})
+        metrics.registry.collect()
         cache.clear()
-        content_cache_clear = self.authorized_client.get(
-            reverse('posts:index')).content
-        self.assertNotEqual(content_add, content_cache_clear)
+
+        def card_stats():
+            values = metrics.registry.collect().get('posts:profile', {})
+            return {
+                'hits': values.get('card_hits', 0),
+                'misses': values.get('card_misses', 0),
+            }
+
+        self.client.get(url)
+        self.assertEqual(card_stats(), {'hits': 0, 'misses': 1})
+        self.client.get(url)
+        self.assertEqual(card_stats(), {'hits': 1, 'misses': 1})
+
+        post = Post.objects.get(pk=self.post.pk)
+        post.text = 'Исправленный текст'
+        post.save()
+        response = self.client.get(url)
+        self.assertContains(response, 'Исправленный текст')
+        self.assertEqual(card_stats(), {'hits': 1, 'misses': 2})
 
 
 class PaginatorViewsTest(TestCase):
@@ -167,6 +276,7 @@ class PaginatorViewsTest(TestCase):
         ]
 
         Post.objects.bulk_create(posts)
+        recount_all()
 
     def setUp(self):
         self.unauthorized_client = Client()
@@ -190,6 +300,101 @@ class PaginatorViewsTest(TestCase):
                     self.POSTS_ON_SECOND_PAGE
                 )
 
+    @override_settings(NUMBER_POST=1)
+    def test_page_range_is_elided(self):
+        """Пагинатор показывает края и окно вокруг текущей страницы."""
+        response = self.unauthorized_client.get(
+            reverse('posts:index'), {'page': 7})
+        last = Post.objects.count()
+        self.assertEqual(response.content.decode().count('&hellip;'), 2)
+        for page in (1, 4, 10, last):
+            self.assertContains(response, f'page={page}"')
+        for page in (2, 3, 11, last - 1):
+            self.assertNotContains(response, f'page={page}"')
+
+    @override_settings(NUMBER_POST=1, EXACT_COUNT_THRESHOLD=0)
+    def test_underestimated_count_keeps_old_posts(self):
+        """Заниженное число постов не отрезает старые посты."""
+        url = reverse('posts:index')
+        total = Post.objects.count()
+        cache.set('posts:total', 3)
+        last = self.unauthorized_client.get(url, {'page': 3})
+        self.assertTrue(last.context['page_obj'].has_next())
+        deeper = self.unauthorized_client.get(url, {'page': total})
+        self.assertEqual(
+            list(deeper.context['page_obj']),
+            [Post.objects.feed().last()])
+        self.assertFalse(deeper.context['page_obj'].has_next())
+        seen = []
+        page_obj = self.unauthorized_client.get(url).context['page_obj']
+        while True:
+            seen += list(page_obj)
+            if not page_obj.has_next():
+                break
+            page_obj = self.unauthorized_client.get(
+                url, {'after': page_obj.next_cursor}).context['page_obj']
+        self.assertEqual(len(seen), total)
+
+    def test_elided_page_range_size(self):
+        """Длина списка страниц не зависит от их числа."""
+        for num_pages in (1, 5, 12, 1000):
+            for number in range(1, num_pages + 1):
+                pages = list(elided_page_range(number, num_pages))
+                self.assertLessEqual(len(pages), 11)
+                self.assertIn(number, pages)
+                self.assertEqual(pages[0], 1)
+                self.assertEqual(pages[-1], num_pages)
+
+    def test_cursor_paginator_on_pages(self):
+        """Проверка пагинации по курсору ?after=."""
+        url_pages = [
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': self.user.username}),
+        ]
+        for reverse_ in url_pages:
+            with self.subTest(reverse_=reverse_):
+                first_page = self.unauthorized_client.get(
+                    reverse_).context['page_obj']
+                second_page = self.unauthorized_client.get(
+                    reverse_, {'after': first_page.next_cursor}
+                ).context['page_obj']
+                self.assertEqual(
+                    len(second_page), self.POSTS_ON_SECOND_PAGE)
+                self.assertFalse(second_page.has_next())
+                self.assertTrue(
+                    set(first_page).isdisjoint(set(second_page)))
+
+    def test_cursor_paginator_bad_cursor(self):
+        """Битый курсор открывает первую страницу ленты."""
+        page_obj = self.unauthorized_client.get(
+            reverse('posts:index'), {'after': 'битый'}
+        ).context['page_obj']
+        self.assertEqual(len(page_obj), settings.NUMBER_POST)
+        self.assertFalse(page_obj.has_previous())
+
+    def test_comments_pages(self):
+        """Первая страница комментариев в посте, следующие - фрагментом."""
+        post = Post.objects.filter(author=self.user).first()
+        Comment.objects.bulk_create([
+            Comment(post=post, author=self.user, text=f'Комментарий {i}')
+            for i in range(settings.NUMBER_COMMENTS + 3)
+        ])
+        first_page = self.unauthorized_client.get(
+            reverse('posts:post_detail', kwargs={'post_id': post.id})
+        ).context['comments_page']
+        self.assertEqual(len(first_page), settings.NUMBER_COMMENTS)
+        response = self.unauthorized_client.get(
+            reverse('posts:post_comments', kwargs={'post_id': post.id}),
+            {'after': first_page.next_cursor},
+        )
+        self.assertTemplateUsed(
+            response, 'posts/includes/comment_list.html')
+        second_page = response.context['comments_page']
+        self.assertEqual(len(second_page), 3)
+        self.assertFalse(second_page.has_next())
+        self.assertTrue(set(first_page).isdisjoint(set(second_page)))
+
 
 class FollowViewsTest(TestCase):
     @classmethod
@@ -268,3 +473,255 @@ class FollowViewsTest(TestCase):
             reverse('posts:follow_index'))
 
         self.assertNotIn(post, response.context['page_obj'])
+
+    def test_timeline_follow_and_unfollow(self):
+        """Лента подписок заполняется при подписке и чистится при отписке."""
+        self.follower_client.get(
+            reverse(
+                'posts:profile_follow',
+                kwargs={'username': self.owner.username})
+        )
+        self.assertTrue(Timeline.objects.filter(
+            user=self.best_follower, post=self.post).exists())
+        new_post = Post.objects.create(
+            author=self.owner,
+            text='Новый пост'
+        )
+        self.assertTrue(Timeline.objects.filter(
+            user=self.best_follower, post=new_post).exists())
+
+        self.follower_client.get(
+            reverse(
+                'posts:profile_unfollow',
+                kwargs={'username': self.owner.username})
+        )
+        self.assertFalse(
+            Timeline.objects.filter(user=self.best_follower).exists())
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=0)
+    def test_timeline_huge_author_fallback(self):
+        """Посты популярного автора читаются через join по подпискам."""
+        Follow.objects.create(
+            user=self.best_follower,
+            author=self.owner
+        )
+        post = Post.objects.create(
+            author=self.owner,
+            text='Пост для миллиона подписчиков'
+        )
+        self.assertFalse(Timeline.objects.exists())
+
+        response = self.follower_client.get(
+            reverse('posts:follow_index'))
+
+        self.assertIn(post, response.context['page_obj'])
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=1)
+    def test_timeline_refilled_below_limit(self):
+        """Посты, не разосланные популярным автором, не пропадают."""
+        other = User.objects.create(username='other')
+        Follow.objects.create(user=self.best_follower, author=self.owner)
+        follow = Follow.objects.create(user=other, author=self.owner)
+        post = Post.objects.create(author=self.owner, text='Не разослан')
+        follow.delete()
+
+        response = self.follower_client.get(
+            reverse('posts:follow_index'))
+
+        self.assertIn(post, response.context['page_obj'])
+        self.assertIn(self.post, response.context['page_obj'])
+
+    @override_settings(NUMBER_POST=2)
+    def test_timeline_pages_by_pub_date(self):
+        """Лента подписок листается курсором в порядке даты постов."""
+        Follow.objects.create(user=self.best_follower, author=self.owner)
+        older = Post.objects.create(author=self.owner, text='Старый')
+        Post.objects.filter(pk=older.pk).update(
+            pub_date=self.post.pub_date - timedelta(days=1))
+        # Дата в ленте копируется из поста при рассылке.
+        Timeline.objects.filter(post=older).update(
+            pub_date=self.post.pub_date - timedelta(days=1))
+        newer = Post.objects.create(author=self.owner, text='Новый')
+        url = reverse('posts:follow_index')
+
+        first_page = self.follower_client.get(url).context['page_obj']
+        self.assertEqual(list(first_page), [newer, self.post])
+        self.assertTrue(first_page.has_next())
+        second_page = self.follower_client.get(
+            url, {'after': first_page.next_cursor}).context['page_obj']
+        self.assertEqual(list(second_page), [older])
+        self.assertFalse(second_page.has_next())
+
+    @override_settings(TIMELINE_BACKFILL_SIZE=2)
+    def test_timeline_capped(self):
+        """В ленте подписчика остаются только свежие посты."""
+        Follow.objects.create(user=self.best_follower, author=self.owner)
+        posts = [
+            Post.objects.create(author=self.owner, text=f'Пост {i}')
+            for i in range(3)
+        ]
+        self.assertCountEqual(
+            Timeline.objects.filter(
+                user=self.best_follower).values_list('post', flat=True),
+            [posts[1].pk, posts[2].pk],
+        )
+
+
+class SearchViewsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username='auth')
+        cls.post = Post.objects.create(
+            author=cls.user,
+            text='Шалтай-Болтай сидел на стене',
+        )
+        cls.other_post = Post.objects.create(
+            author=cls.user,
+            text='Совсем другой текст',
+        )
+
+    def search(self, query):
+        response = self.client.get(reverse('posts:search'), {'q': query})
+        return list(response.context['page_obj'])
+
+    def test_search_finds_post(self):
+        """Поиск находит пост по слову без учёта регистра."""
+        self.assertEqual(self.search('СТЕНЕ'), [self.post])
+
+    def test_search_follows_edits(self):
+        """Индекс обновляется при правке и удалении поста."""
+        self.other_post.text = 'Теперь тоже про стене'
+        self.other_post.save()
+        self.assertCountEqual(
+            self.search('стене'), [self.post, self.other_post])
+        self.other_post.delete()
+        self.assertEqual(self.search('стене'), [self.post])
+
+    def test_search_ignores_query_syntax(self):
+        """Спецсимволы FTS5 в запросе не ломают поиск."""
+        self.assertEqual(self.search('"стене AND ('), [])
+
+
+class ExportViewsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.stranger = User.objects.create_user(username='stranger')
+        cls.moderator = User.objects.create_user(
+            username='moderator', is_staff=True)
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание группы',
+        )
+        cls.posts = Post.objects.bulk_create([
+            Post(text=f'Пост #{i}', author=cls.author, group=cls.group)
+            for i in range(3)
+        ])
+
+    def setUp(self):
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+
+    def get_lines(self, response):
+        content = b''.join(response.streaming_content)
+        if response['Content-Type'] == 'application/gzip':
+            content = gzip.decompress(content)
+        return content.decode().splitlines()
+
+    def test_profile_export_jsonl(self):
+        """Автор выгружает свои посты в JSONL, в том числе сжатыми."""
+        url = reverse('posts:profile_export', kwargs={'username': 'author'})
+        for params in ({}, {'gzip': 1}):
+            with self.subTest(params=params):
+                response = self.author_client.get(url, params)
+                rows = [json.loads(line) for line in self.get_lines(response)]
+                self.assertEqual(
+                    [row['text'] for row in rows],
+                    [post.text for post in self.posts])
+
+    def test_group_export_csv(self):
+        """Модератор выгружает посты группы в CSV."""
+        client = Client()
+        client.force_login(self.moderator)
+        response = client.get(
+            reverse('posts:group_export', kwargs={'slug': self.group.slug}),
+            {'format': 'csv'})
+        lines = self.get_lines(response)
+        self.assertEqual(
+            lines[0], 'id,text,pub_date,author_id,group_id,image')
+        self.assertEqual(len(lines), len(self.posts) + 1)
+
+    def test_export_forbidden(self):
+        """Чужие посты и группы выгружать нельзя."""
+        client = Client()
+        client.force_login(self.stranger)
+        urls = [
+            reverse('posts:profile_export', kwargs={'username': 'author'}),
+            reverse('posts:group_export', kwargs={'slug': self.group.slug}),
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertEqual(
+                    client.get(url).status_code, HTTPStatus.FORBIDDEN)
+
+
+class ConditionalViewsTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание')
+        cls.post = Post.objects.create(
+            text='Пост', author=cls.author, group=cls.group)
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def test_not_modified(self):
+        """Неизменная страница отвечает 304 без запросов к базе."""
+        urls = [
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': 'author'}),
+            reverse('posts:post_detail', kwargs={'post_id': self.post.id}),
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.guest_client.get(url)
+                for header, value in (
+                        ('HTTP_IF_NONE_MATCH', response['ETag']),
+                        ('HTTP_IF_MODIFIED_SINCE',
+                         response['Last-Modified'])):
+                    with self.assertNumQueries(0):
+                        response = self.guest_client.get(
+                            url, **{header: value})
+                    self.assertEqual(
+                        response.status_code, HTTPStatus.NOT_MODIFIED)
+
+    def test_modified_after_change(self):
+        """Новый комментарий меняет ETag страницы поста."""
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.id})
+        etag = self.guest_client.get(url)['ETag']
+        Comment.objects.create(
+            post=self.post, author=self.reader, text='Комментарий')
+        response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+
+    def test_user_pages(self):
+        """Страница читателя зависит от его подписок: без Last-Modified."""
+        url = reverse('posts:profile', kwargs={'username': 'author'})
+        response = self.reader_client.get(url)
+        self.assertFalse(response.has_header('Last-Modified'))
+        self.assertNotEqual(
+            response['ETag'], self.guest_client.get(url)['ETag'])
+        Follow.objects.create(user=self.reader, author=self.author)
+        response = self.reader_client.get(
+            url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertTrue(response.context['following'])
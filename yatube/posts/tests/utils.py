@@ -0,0 +1,25 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+class QueryBudgetMixin:
+    """Проверка числа SQL-запросов на страницу.
+
+    Бюджет фиксируется в тесте: N+1 в шаблоне или вьюхе
+    сразу ломает сборку.
+    """
+
+    def assertQueryBudget(self, budget, method, url, data=None):
+        with CaptureQueriesContext(connection) as context:
+            response = method(url, data)
+            if response.streaming:
+                b''.join(response.streaming_content)
+        queries = '\n'.join(
+            query['sql'] for query in context.captured_queries
+        )
+        self.assertEqual(
+            len(context), budget,
+            f'{url}: {len(context)} запросов при бюджете {budget}\n'
+            f'{queries}'
+        )
+        return response
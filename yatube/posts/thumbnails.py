@@ -0,0 +1,113 @@
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+
+import django
+from django.conf import settings
+from django.db import connection
+from sorl.thumbnail import get_thumbnail
+
+from .caching import bump_generation
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+CARD_GEOMETRY = '960x339'
+CARD_OPTIONS = {'crop': 'center', 'upscale': True}
+
+_executor = None
+
+
+def render_thumbnail(image_name):
+    """Строит миниатюру карточки и возвращает её имя в хранилище.
+
+    Выполняется в процессе пула, поэтому ошибки не пробрасываются.
+    """
+    try:
+        thumbnail = get_thumbnail(image_name, CARD_GEOMETRY, **CARD_OPTIONS)
+        if thumbnail.exists():
+            return thumbnail.name
+    except Exception:
+        logger.exception('Не удалось построить миниатюру %s', image_name)
+    return ''
+
+
+def make_executor(workers):
+    # spawn: дочерние процессы не наследуют соединения с БД.
+    return ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context('spawn'),
+        initializer=django.setup,
+    )
+
+
+def get_executor():
+    """Общий пул процессов для миниатюр, создаётся при первой задаче."""
+    global _executor
+    if _executor is None:
+        _executor = make_executor(settings.THUMBNAIL_WORKERS)
+    return _executor
+
+
+def discard_executor(executor):
+    """Забывает сломанный пул; следующая задача создаст новый."""
+    global _executor
+    if _executor is executor:
+        _executor = None
+    executor.shutdown(wait=False)
+
+
+def save_thumbnail(post_id, image_name, thumbnail_name):
+    # Картинку могли заменить, пока строилась миниатюра.
+    updated = Post.objects.filter(pk=post_id, image=image_name).update(
+        thumbnail=thumbnail_name
+    )
+    if updated:
+        bump_generation()
+    return updated
+
+
+def _on_done(executor, post_id, image_name, future):
+    try:
+        thumbnail_name = future.result()
+    except BrokenProcessPool:
+        # Процесс пула упал: миниатюра останется ленивой в шаблоне.
+        logger.exception('Пул миниатюр сломан, пост %s', post_id)
+        discard_executor(executor)
+        return
+    except Exception:
+        logger.exception('Не удалось построить миниатюру поста %s', post_id)
+        return
+    # Колбэк идёт в служебном потоке пула: своё соединение с базой
+    # он должен закрыть сам, как это делает обработчик запроса.
+    try:
+        save_thumbnail(post_id, image_name, thumbnail_name)
+    finally:
+        connection.close()
+
+
+def schedule(post):
+    """Ставит построение миниатюры поста в очередь пула процессов.
+
+    Шаблоны берут готовое имя из Post.thumbnail и не ресайзят
+    картинку внутри запроса.
+    """
+    Post.objects.filter(pk=post.pk).update(thumbnail='')
+    if not post.image:
+        return
+    if not settings.THUMBNAIL_WORKERS:
+        save_thumbnail(post.pk, post.image.name,
+                       render_thumbnail(post.image.name))
+        return
+    executor = get_executor()
+    try:
+        future = executor.submit(render_thumbnail, post.image.name)
+    except (BrokenProcessPool, RuntimeError):
+        # Пустой thumbnail: шаблон построит миниатюру сам, как раньше.
+        logger.exception('Пул миниатюр недоступен, пост %s', post.pk)
+        discard_executor(executor)
+        return
+    future.add_done_callback(
+        partial(_on_done, executor, post.pk, post.image.name))
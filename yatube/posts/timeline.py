@@ -0,0 +1,190 @@
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count, Max
+
+from .models import Follow, Post, Timeline, UserStats
+from .paginators import CursorPaginator
+
+
+def is_huge_author(author):
+    """Слишком популярным авторам ленту не рассылаем."""
+    followers = Follow.objects.filter(author=author).count()
+    return followers > settings.TIMELINE_FANOUT_LIMIT
+
+
+def fan_out(post):
+    """Добавляет новый пост в ленты всех подписчиков автора."""
+    if is_huge_author(post.author):
+        return
+    followers = Follow.objects.filter(
+        author=post.author
+    ).values_list('user_id', flat=True)
+    Timeline.objects.bulk_create(
+        [
+            Timeline(user_id=user_id, post=post, pub_date=post.pub_date)
+            for user_id in followers
+        ],
+        batch_size=settings.TIMELINE_BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+    cap(f'SELECT user_id FROM {Follow._meta.db_table} WHERE author_id = %s',
+        [post.author_id])
+
+
+def backfill(user, author):
+    """Заполняет ленту свежими постами автора после подписки."""
+    if is_huge_author(author):
+        return
+    posts = Post.objects.filter(author=author).values_list(
+        'id', 'pub_date'
+    )[:settings.TIMELINE_BACKFILL_SIZE]
+    Timeline.objects.bulk_create(
+        [
+            Timeline(user=user, post_id=post_id, pub_date=pub_date)
+            for post_id, pub_date in posts
+        ],
+        batch_size=settings.TIMELINE_BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+    cap('SELECT %s', [user.pk])
+
+
+def trim(user, author):
+    """Убирает из ленты посты автора после отписки."""
+    Timeline.objects.filter(user=user, post__author=author).delete()
+
+
+def refill(author_id):
+    """Досылает посты автора, переставшего быть слишком популярным.
+
+    Пока подписчиков было больше TIMELINE_FANOUT_LIMIT, новые посты
+    не рассылались, а новым подписчикам не заполнялась лента. Когда
+    после отписки их снова ровно TIMELINE_FANOUT_LIMIT, ленты читаются
+    из Timeline, поэтому свежие посты автора добавляются всем
+    подписчикам одним INSERT ... SELECT.
+    """
+    followers = Follow.objects.filter(author_id=author_id).count()
+    if followers != settings.TIMELINE_FANOUT_LIMIT:
+        return
+    timeline_table = Timeline._meta.db_table
+    follow_table = Follow._meta.db_table
+    post_table = Post._meta.db_table
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {timeline_table} (user_id, post_id, pub_date) '
+            f'SELECT f.user_id, p.id, p.pub_date FROM {follow_table} f '
+            f'JOIN (SELECT id, pub_date FROM {post_table} '
+            f'WHERE author_id = %s '
+            f'ORDER BY pub_date DESC, id DESC LIMIT %s) p ON 1 = 1 '
+            f'WHERE f.author_id = %s AND NOT EXISTS ('
+            f'SELECT 1 FROM {timeline_table} t '
+            f'WHERE t.user_id = f.user_id AND t.post_id = p.id)',
+            [author_id, settings.TIMELINE_BACKFILL_SIZE, author_id],
+        )
+        cap(f'SELECT user_id FROM {follow_table} WHERE author_id = %s',
+            [author_id], cursor)
+
+
+def cap(users_sql, params, cursor=None):
+    """Оставляет в лентах пользователей TIMELINE_BACKFILL_SIZE свежих постов.
+
+    users_sql выбирает id пользователей, чьи ленты только что выросли.
+    Длина ленты ограничена, поэтому её чтение и обрезка не зависят
+    от того, сколько постов написали авторы за всё время.
+    """
+    if cursor is None:
+        with connection.cursor() as cursor:
+            return cap(users_sql, params, cursor)
+    timeline_table = Timeline._meta.db_table
+    cursor.execute(
+        f'DELETE FROM {timeline_table} WHERE id IN ('
+        f'SELECT id FROM (SELECT id, ROW_NUMBER() OVER ('
+        f'PARTITION BY user_id ORDER BY pub_date DESC, post_id DESC'
+        f') AS position FROM {timeline_table} '
+        f'WHERE user_id IN ({users_sql})) ranked '
+        f'WHERE position > %s)',
+        [*params, settings.TIMELINE_BACKFILL_SIZE],
+    )
+
+
+def follows_huge_author(user):
+    # Счётчик подписчиков вместо GROUP BY по всем подпискам авторов.
+    return UserStats.objects.filter(
+        user__following__user=user,
+        followers_count__gt=settings.TIMELINE_FANOUT_LIMIT,
+    ).exists()
+
+
+def follow_version(user):
+    """Меняется при каждой подписке и отписке пользователя.
+
+    Новая подписка увеличивает последний id, отписка - число.
+    """
+    follows = Follow.objects.filter(user=user).aggregate(
+        total=Count('id'), last=Max('id'))
+    return follows['total'], follows['last']
+
+
+class TimelinePaginator(CursorPaginator):
+    """Листает ленту по индексу (user, pub_date, post) без join.
+
+    Выборка страницы берёт из индекса только id постов, сами посты
+    с авторами и группами загружаются вторым запросом.
+    """
+
+    def __init__(self, user, per_page, **kwargs):
+        entries = Timeline.objects.filter(user=user).order_by(
+            '-pub_date', '-post_id').values_list('post_id', flat=True)
+        super().__init__(entries, per_page, key='post_id', **kwargs)
+
+    def load(self, rows):
+        posts = Post.objects.feed().in_bulk(rows)
+        # Пост мог быть удалён между двумя запросами.
+        return [posts[post_id] for post_id in rows if post_id in posts]
+
+
+def get_follow_page(user, cursor=None, per_page=None):
+    """Страница ленты подписок пользователя по курсору ?after=.
+
+    Читается из заранее собранной ленты; если пользователь подписан
+    на автора, которому лента не рассылается, используется join
+    по подпискам.
+    """
+    per_page = per_page or settings.NUMBER_POST
+    if follows_huge_author(user):
+        paginator = CursorPaginator(
+            Post.objects.filter(author__following__user=user).feed(),
+            per_page,
+        )
+    else:
+        paginator = TimelinePaginator(user, per_page)
+    return paginator.page_after(cursor)
+
+
+def rebuild():
+    """Собирает все ленты заново одним INSERT ... SELECT.
+
+    Нужна после массовой загрузки, которая обходит сигналы.
+    Каждая лента, как и при рассылке, ограничена
+    TIMELINE_BACKFILL_SIZE свежими постами.
+    """
+    timeline_table = Timeline._meta.db_table
+    follow_table = Follow._meta.db_table
+    post_table = Post._meta.db_table
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {timeline_table}')
+        cursor.execute(
+            f'INSERT INTO {timeline_table} (user_id, post_id, pub_date) '
+            f'SELECT user_id, post_id, pub_date FROM ('
+            f'SELECT f.user_id, p.id AS post_id, p.pub_date, '
+            f'ROW_NUMBER() OVER (PARTITION BY f.user_id '
+            f'ORDER BY p.pub_date DESC, p.id DESC) AS position '
+            f'FROM {follow_table} f '
+            f'JOIN {post_table} p ON p.author_id = f.author_id '
+            f'WHERE f.author_id IN ('
+            f'SELECT author_id FROM {follow_table} '
+            f'GROUP BY author_id HAVING COUNT(*) <= %s)) ranked '
+            f'WHERE position <= %s',
+            [settings.TIMELINE_FANOUT_LIMIT,
+             settings.TIMELINE_BACKFILL_SIZE],
+        )
@@ -1,37 +1,87 @@
 from django.contrib.auth import get_user_model
 from django.contrib.auth.decorators import login_required
-from django.core.paginator import Paginator
+from django.core.exceptions import PermissionDenied
+from django.http import Http404, StreamingHttpResponse
 from django.shortcuts import get_object_or_404, redirect, render
-from django.views.decorators.cache import cache_page
+from django.utils.http import urlencode
+from django.views.decorators.http import condition
 from django.conf import settings
 
+from . import exports, thumbnails
+from .caching import cache_feed, get_last_modified, make_etag
+from .counters import total_posts
 from .forms import CommentForm, PostForm
-from .models import Follow, Post, Group
+from .models import Comment, Follow, Post, Group
+from .paginators import CountedPaginator, CursorPaginator, encode_cursor
+from .search import search_posts
+from .timeline import follow_version, get_follow_page
 
 User = get_user_model()
 
 
-def get_paginator(request, post):
-    paginator = Paginator(post, settings.NUMBER_POST)
+def get_paginator(request, post, use_cursor=True, count=None):
+    """Страница ленты; count - известное заранее число постов."""
+    cursor = request.GET.get('after') if use_cursor else None
+    if cursor is not None:
+        paginator = CursorPaginator(post, settings.NUMBER_POST)
+        return paginator.page_after(cursor)
+    paginator = CountedPaginator(post, settings.NUMBER_POST, count=count)
     page_number = request.GET.get('page')
-    return paginator.get_page(page_number)
+    page_obj = paginator.get_page(page_number)
+    if use_cursor and page_obj.has_next():
+        page_obj.next_cursor = encode_cursor(page_obj[-1])
+    return page_obj
 
 
-@cache_page(20, key_prefix='index_page')
+def get_comments_page(request, post_id, param='after'):
+    """Страница комментариев поста с авторами, одним запросом."""
+    comments = Comment.objects.filter(post_id=post_id).select_related(
+        'author')
+    paginator = CursorPaginator(
+        comments, settings.NUMBER_COMMENTS, field='created')
+    return paginator.page_after(request.GET.get(param))
+
+
+def page_etag(request, *args, **kwargs):
+    """ETag страницы: контент, пользователь и CSRF-токен его форм."""
+    return make_etag(
+        request, request.user.pk,
+        request.COOKIES.get(settings.CSRF_COOKIE_NAME),
+    )
+
+
+def profile_etag(request, username):
+    etag = page_etag(request)
+    if request.user.is_authenticated:
+        # Кнопка подписки зависит от подписок читателя.
+        etag = make_etag(request, etag, *follow_version(request.user))
+    return etag
+
+
+def page_last_modified(request, *args, **kwargs):
+    # Страница вошедшего пользователя зависит не только от контента.
+    if request.user.is_authenticated:
+        return None
+    return get_last_modified()
+
+
+@cache_feed('index_page')
 def index(request):
-    post_list = Post.objects.all()
-    page_obj = get_paginator(request, post_list)
+    post_list = Post.objects.feed()
+    page_obj = get_paginator(request, post_list, count=total_posts())
     context = {
         'page_obj': page_obj,
     }
     return render(request, 'posts/index.html', context)
 
 
+@condition(etag_func=page_etag, last_modified_func=page_last_modified)
+@cache_feed('group_page')
 def group_posts(request, slug):
     """Выводит шаблон с группами постов"""
     group = get_object_or_404(Group, slug=slug)
-    posts = group.posts.all()
-    page_obj = get_paginator(request, posts)
+    posts = group.posts.feed()
+    page_obj = get_paginator(request, posts, count=group.posts_count)
     context = {
         'group': group,
         'page_obj': page_obj,
@@ -39,10 +89,14 @@ def group_posts(request, slug):
     return render(request, 'posts/group_list.html', context)
 
 
+@condition(etag_func=profile_etag, last_modified_func=page_last_modified)
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
-    post_list = author.posts.all()
-    page_obj = get_paginator(request, post_list)
+    author = get_object_or_404(
+        User.objects.select_related('stats'), username=username
+    )
+    post_list = author.posts.feed()
+    page_obj = get_paginator(
+        request, post_list, count=author.stats.posts_count)
     following = request.user.is_authenticated
 
     if following:
@@ -56,18 +110,44 @@ def profile(request, username):
     return render(request, 'posts/profile.html', context)
 
 
+def search(request):
+    query = request.GET.get('q', '').strip()
+    post_list = search_posts(query).feed() if query else Post.objects.none()
+    # Выдача упорядочена по релевантности, курсор по дате к ней не подходит.
+    page_obj = get_paginator(request, post_list, use_cursor=False)
+    context = {
+        'query': query,
+        'page_obj': page_obj,
+        'page_query': urlencode({'q': query}) + '&',
+    }
+    return render(request, 'posts/search.html', context)
+
+
+@condition(etag_func=page_etag, last_modified_func=page_last_modified)
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, id=post_id)
-    comments = post.comments.all()
+    post = get_object_or_404(
+        Post.objects.feed().select_related('author__stats'), id=post_id
+    )
     form = CommentForm()
     context = {
         'post': post,
-        'comments': comments,
+        'comments_page': get_comments_page(
+            request, post.id, 'comments_after'),
         'form': form,
     }
     return render(request, 'posts/post_detail.html', context)
 
 
+def post_comments(request, post_id):
+    """Следующая страница комментариев фрагментом HTML."""
+    post = get_object_or_404(Post.objects.only('id'), id=post_id)
+    context = {
+        'post': post,
+        'comments_page': get_comments_page(request, post.id),
+    }
+    return render(request, 'posts/includes/comment_list.html', context)
+
+
 @login_required
 def post_create(request):
     form = PostForm(request.POST or None, files=request.FILES or None)
@@ -75,6 +155,7 @@ def post_create(request):
         post = form.save(commit=False)
         post.author = request.user
         post.save()
+        thumbnails.schedule(post)
         return redirect('posts:profile', post.author)
     context = {
         'form': form,
@@ -86,7 +167,7 @@ def post_create(request):
 @login_required
 def post_edit(request, post_id):
     post = get_object_or_404(Post, id=post_id)
-    if request.user != post.author:
+    if request.user.id != post.author_id:
         return redirect('posts:post_detail', post_id)
     form = PostForm(
         request.POST or None,
@@ -95,6 +176,8 @@ def post_edit(request, post_id):
     )
     if form.is_valid():
         form.save()
+        if 'image' in form.changed_data:
+            thumbnails.schedule(post)
         return redirect('posts:post_detail', post.id)
     context = {
         'form': form,
@@ -118,8 +201,8 @@ def add_comment(request, post_id):
 
 @login_required
 def follow_index(request):
-    post_list = Post.objects.filter(author__following__user=request.user)
-    page_obj = get_paginator(request, post_list)
+    # Лента листается только курсором: без COUNT(*) и OFFSET.
+    page_obj = get_follow_page(request.user, request.GET.get('after'))
     context = {'page_obj': page_obj}
     return render(request, 'posts/follow.html', context)
 
@@ -141,3 +224,40 @@ def profile_unfollow(request, username):
     )
     follower.delete()
     return redirect('posts:profile', username)
+
+
+def export_response(request, name, **lookup):
+    kind = request.GET.get('kind', 'posts')
+    file_format = request.GET.get('format', 'jsonl')
+    compress = 'gzip' in request.GET
+    if kind not in exports.FIELDS or file_format not in exports.ENCODERS:
+        raise Http404
+    queryset = exports.get_queryset(kind, **lookup)
+    filename = f'{name}-{kind}.{file_format}'
+    if compress:
+        content_type = 'application/gzip'
+        filename += '.gz'
+    else:
+        content_type = exports.CONTENT_TYPES[file_format]
+    response = StreamingHttpResponse(
+        exports.stream_export(queryset, kind, file_format, compress),
+        content_type=content_type,
+    )
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+@login_required
+def profile_export(request, username):
+    author = get_object_or_404(User, username=username)
+    if request.user != author and not request.user.is_staff:
+        raise PermissionDenied
+    return export_response(request, author.username, author=author)
+
+
+@login_required
+def group_export(request, slug):
+    if not request.user.is_staff:
+        raise PermissionDenied
+    group = get_object_or_404(Group, slug=slug)
+    return export_response(request, group.slug, group=group)
@@ -0,0 +1,42 @@
+from django.contrib import admin, messages
+from django.contrib.auth import get_user_model
+from django.contrib.auth.admin import UserAdmin
+
+from posts.deletion import get_progress, schedule
+
+User = get_user_model()
+
+
+class BatchDeletionUserAdmin(UserAdmin):
+    list_display = UserAdmin.list_display + ('deletion_progress',)
+    actions = ('delete_in_batches',)
+
+    def get_actions(self, request):
+        actions = super().get_actions(request)
+        # Каскадное удаление держит блокировку базы до конца.
+        actions.pop('delete_selected', None)
+        return actions
+
+    def delete_in_batches(self, request, queryset):
+        user_ids = list(queryset.values_list('pk', flat=True))
+        schedule(user_ids)
+        self.message_user(
+            request,
+            f'Удаление пользователей запущено: {len(user_ids)}. '
+            'Ход виден в колонке «Удаление».',
+            messages.SUCCESS,
+        )
+    delete_in_batches.short_description = 'Удалить пачками в фоне'
+
+    def deletion_progress(self, user):
+        progress = get_progress(user.pk)
+        if progress is None:
+            return ''
+        if not progress['total']:
+            return progress['stage']
+        return f'{progress["stage"]}: {progress["done"]}/{progress["total"]}'
+    deletion_progress.short_description = 'Удаление'
+
+
+admin.site.unregister(User)
+admin.site.register(User, BatchDeletionUserAdmin)
@@ -0,0 +1,40 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+from django.db import router
+
+User = get_user_model()
+
+
+def snapshot_key(user_id):
+    return f'users:snapshot:{user_id}'
+
+
+def forget_user(user_id):
+    """Сбрасывает снимок; вызывается при сохранении, удалении и выходе."""
+    cache.delete(snapshot_key(user_id))
+
+
+class CachedModelBackend(ModelBackend):
+    """ModelBackend, берущий пользователя запроса из кэша.
+
+    В кэше лежат только значения полей модели, а не объект
+    со связями. Хеш пароля входит в снимок, поэтому проверка
+    сессии после смены пароля работает как обычно.
+    """
+
+    def get_user(self, user_id):
+        key = snapshot_key(user_id)
+        fields = cache.get(key)
+        if fields is None:
+            user = super().get_user(user_id)
+            if user is not None:
+                cache.set(key, {
+                    field.attname: getattr(user, field.attname)
+                    for field in User._meta.concrete_fields
+                }, settings.USER_CACHE_TIMEOUT)
+            return user
+        user = User.from_db(
+            router.db_for_read(User), list(fields), list(fields.values()))
+        return user if self.user_can_authenticate(user) else None
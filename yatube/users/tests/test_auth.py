@@ -0,0 +1,59 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..backends import snapshot_key
+
+User = get_user_model()
+
+
+class CachedAuthTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username='user', password='old-password')
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.login(username='user', password='old-password')
+        self.url = reverse('about:author')
+
+    def get_user(self):
+        return self.client.get(self.url).wsgi_request.user
+
+    def test_user_and_session_from_cache(self):
+        """Сессия и пользователь читаются из кэша без запросов к базе."""
+        self.get_user()
+        with self.assertNumQueries(0):
+            self.assertEqual(self.get_user().username, 'user')
+
+    def test_session_survives_cache_loss(self):
+        """Сессия пишется и в базу, потеря кэша не разлогинивает."""
+        self.get_user()
+        cache.clear()
+        self.assertTrue(self.get_user().is_authenticated)
+
+    def test_password_change_ends_sessions(self):
+        """После смены пароля старые сессии недействительны."""
+        self.get_user()
+        user = User.objects.get(pk=self.user.pk)
+        user.set_password('new-password')
+        user.save()
+        self.assertFalse(self.get_user().is_authenticated)
+
+    def test_deactivated_user(self):
+        """Сохранение пользователя сбрасывает его снимок."""
+        self.get_user()
+        user = User.objects.get(pk=self.user.pk)
+        user.is_active = False
+        user.save()
+        self.assertFalse(self.get_user().is_authenticated)
+
+    def test_logout_forgets_snapshot(self):
+        """Выход удаляет снимок пользователя из кэша."""
+        self.get_user()
+        self.assertIsNotNone(cache.get(snapshot_key(self.user.pk)))
+        self.client.logout()
+        self.assertIsNone(cache.get(snapshot_key(self.user.pk)))
@@ -1,4 +1,5 @@
 import os
+import sys
 
 from dotenv import load_dotenv
 
@@ -29,6 +30,12 @@ CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 
+# Сессии читаются из кэша, а пишутся и в кэш, и в базу.
+SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+# Пользователь запроса берётся из снимка в кэше, см. users.backends.
+AUTHENTICATION_BACKENDS = ['users.backends.CachedModelBackend']
+USER_CACHE_TIMEOUT = 60 * 15
+
 LOGIN_URL = 'users:login'
 LOGIN_REDIRECT_URL = 'posts:index'
 
@@ -46,9 +53,12 @@ INSTALLED_APPS = [
     'users.apps.UsersConfig',
     'core.apps.CoreConfig',
     'about.apps.AboutConfig',
+    'api.apps.ApiConfig',
+    'benchmarks.apps.BenchmarksConfig',
 ]
 
 MIDDLEWARE = [
+    'core.middleware.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -63,7 +73,7 @@ ROOT_URLCONF = 'yatube.urls'
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'core.metrics.DjangoTemplates',
         'DIRS': [TEMPLATES_DIR],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -79,11 +89,29 @@ TEMPLATES = [
     },
 ]
 
+# Общий для всех воркеров хоста кэш в файле, отображённом в память,
+# см. core.mmapcache. Файл занимает MAX_SIZE байт; после изменения
+# OPTIONS нужно перезапустить все воркеры.
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'BACKEND': 'core.metrics.MmapCache',
+        'LOCATION': os.environ.get(
+            'CACHE_PATH', os.path.join(BASE_DIR, 'cache', 'default.cache')),
+        'OPTIONS': {
+            'MAX_SIZE': 64 * 1024 * 1024,
+            'SLOT_SIZE': 64 * 1024,
+            # Слоты 64, 16, 4 и 1 КиБ, каждому размеру - четверть файла.
+            'CLASSES': 4,
+            'WAYS': 8,
+        },
     }
 }
+# Тесты чистят кэш, поэтому работают со своим файлом, а не с кэшем
+# запущенного на этой машине сервера.
+TESTING = sys.argv[1:2] == ['test'] or 'pytest' in sys.modules
+if TESTING:
+    CACHES['default']['LOCATION'] = os.path.join(
+        BASE_DIR, 'cache', 'test.cache')
 
 WSGI_APPLICATION = 'yatube.wsgi.application'
 
@@ -91,9 +119,24 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        # Соединение живёт между запросами воркера.
+        'CONN_MAX_AGE': 60,
     }
 }
 
+# PRAGMA для каждого нового соединения SQLite (core.signals).
+# WAL позволяет читать во время записи; synchronous=normal в WAL
+# не теряет целостность, только последние транзакции при сбое ОС.
+SQLITE_PRAGMAS = {
+    'journal_mode': 'wal',
+    'synchronous': 'normal',
+    'busy_timeout': 5000,
+    # Отрицательное значение - в КиБ: 64 МиБ страничного кэша.
+    'cache_size': -64000,
+    'mmap_size': 256 * 1024 * 1024,
+    'temp_store': 'memory',
+}
+
 # if ENABLE_PROD:
 #     DATABASES = {
 #         'default': {
@@ -153,4 +196,69 @@ MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 DEFAULT_AUTO_FIELD = 'django.db.models.AutoField'
 
 NUMBER_POST = 10
+NUMBER_COMMENTS = 20
+# Пагинатор показывает первые и последние PAGINATOR_ON_ENDS страниц
+# и по PAGINATOR_ON_EACH_SIDE вокруг текущей, остальные - многоточием.
+PAGINATOR_ON_EACH_SIDE = 3
+PAGINATOR_ON_ENDS = 1
+# Число постов главной берётся из статистики планировщика, если она
+# показывает больше EXACT_COUNT_THRESHOLD строк, иначе - COUNT(*).
+# Значение кэшируется и сдвигается сигналами создания и удаления.
+# При промахе статистика SQLite обновляется ANALYZE, читающим
+# не больше ROW_ESTIMATE_ANALYSIS_LIMIT строк индекса.
+EXACT_COUNT_THRESHOLD = 10000
+POST_TOTAL_TIMEOUT = 60 * 10
+ROW_ESTIMATE_ANALYSIS_LIMIT = 1000
 CHARS_LENGTH = 15
+
+# Лента подписок: авторам с большим числом подписчиков посты
+# не рассылаются, их читатели получают ленту через join.
+# В ленте каждого подписчика хранится TIMELINE_BACKFILL_SIZE
+# свежих постов, более старые удаляются при рассылке.
+TIMELINE_FANOUT_LIMIT = 10000
+TIMELINE_BACKFILL_SIZE = 1000
+TIMELINE_BATCH_SIZE = 500
+
+# Страницы лент сбрасываются по смене поколения контента,
+# поэтому могут храниться долго.
+FEED_CACHE_TIMEOUT = 60 * 60
+# Сколько ещё держать устаревшую страницу: её отдают, пока один
+# воркер пересчитывает новую.
+FEED_CACHE_STALE_TIMEOUT = 60 * 60
+# Блокировка пересчёта снимается сама, если воркер упал.
+FEED_CACHE_LOCK_TIMEOUT = 30
+# Сколько секунд ждать чужого пересчёта, когда отдать нечего.
+FEED_CACHE_LOCK_WAIT = 2
+# Карточки постов кэшируются по версии содержимого.
+CARD_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Миниатюры строятся пулом процессов сразу после сохранения поста;
+# 0 - строить синхронно в текущем процессе. В тестах пула нет:
+# процессы spawn заново настраивают Django и не видят ни тестовой
+# базы, ни override_settings.
+THUMBNAIL_WORKERS = 0 if TESTING else 2
+
+# Пользователи из админки удаляются пачками в фоновом потоке;
+# False - удалять синхронно в запросе.
+USER_DELETION_IN_BACKGROUND = True
+USER_DELETION_BATCH_SIZE = 500
+
+# Метаданные миниатюр: LRU процесса поверх общего кэша и базы.
+THUMBNAIL_KVSTORE = 'core.kvstore.KVStore'
+THUMBNAIL_KVSTORE_LRU_SIZE = 10000
+
+# Полнотекстовый поиск: FTS5 для SQLite,
+# для PostgreSQL - 'posts.search.PostgresSearchBackend'.
+SEARCH_BACKEND = 'posts.search.SqliteSearchBackend'
+SEARCH_CONFIG = 'russian'
+
+# Выгрузка постов читает базу пачками такого размера.
+EXPORT_CHUNK_SIZE = 2000
+
+# Метрики /metrics: процесс сбрасывает приращения в общий кэш
+# не чаще раза в METRICS_FLUSH_INTERVAL секунд. Файловый кэш из CACHES
+# общий для воркеров gunicorn, поэтому /metrics суммирует их все.
+METRICS_FLUSH_INTERVAL = 10
+METRICS_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10,
+)